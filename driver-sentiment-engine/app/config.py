@@ -10,4 +10,11 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 COOLDOWN_HOURS = int(os.getenv("COOLDOWN_HOURS", 24))
 SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL")
 
+# Route each feedback through the ingest_feedback RPC (sql/002_ingest_feedback.sql)
+# instead of separate insert / read / update calls
+USE_FEEDBACK_RPC = os.getenv("USE_FEEDBACK_RPC", "false").lower() in ("1", "true", "yes")
+
+# Required for /admin/* endpoints; unset → admin endpoints are disabled
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
@@ -0,0 +1,374 @@
+"""
+export_job.py
+──────────────
+Incremental columnar export of feedback history, so analytical scans run
+on files instead of competing with ingestion on the production database:
+  - Feedback rows newer than the last exported id, paged in fixed batches
+    (memory stays bounded by EXPORT_BATCH_SIZE rows)
+  - Partitioned by day(created_at) and entity_type
+  - One full snapshot of driver_sentiment per day
+  - Compaction of the small files incremental runs leave behind
+Two sinks: Hive-style partitioned Parquet (default) or an Iceberg table
+through pyiceberg (optional — configure a catalog to use it).
+
+Run from cron, e.g. every 15 minutes, plus --compact once a night:
+  python -m app.export_job
+  python -m app.export_job --compact
+"""
+
+import argparse
+import json
+import os
+import re
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from app.logger import logger
+from app.repositories.driver_repository import DriverRepository
+from app.repositories.feedback_repository import FeedbackRepository
+
+EXPORT_DIR        = Path(os.getenv("EXPORT_DIR", "export"))
+EXPORT_FORMAT     = os.getenv("EXPORT_FORMAT", "parquet")      # parquet | iceberg
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 5000))
+
+# Rows younger than this wait for the next run. Ids are handed out before
+# commit, so a lower id can become visible after a higher one was exported.
+EXPORT_SAFETY_LAG = float(os.getenv("EXPORT_SAFETY_LAG_SECONDS", 300))
+
+# A partition with at least this many files gets merged by --compact
+COMPACT_MIN_FILES = int(os.getenv("EXPORT_COMPACT_MIN_FILES", 8))
+COMPACT_ROW_GROUP = 128 * 1024
+
+ICEBERG_CATALOG   = os.getenv("EXPORT_ICEBERG_CATALOG", "default")
+ICEBERG_NAMESPACE = os.getenv("EXPORT_ICEBERG_NAMESPACE", "sentiment")
+WATERMARK_PROPERTY = "export.feedback.last-id"
+
+FEEDBACK_SCHEMA = pa.schema([
+    ("id",                   pa.int64()),
+    ("driver_id",            pa.string()),
+    ("trip_id",              pa.string()),
+    ("text",                 pa.string()),
+    ("sentiment",            pa.float64()),
+    ("sentiment_label",      pa.string()),
+    ("entity_type",          pa.string()),
+    ("external_feedback_id", pa.string()),
+    ("lexicon_version",      pa.string()),
+    ("created_at",           pa.timestamp("us")),
+])
+
+DRIVER_SCHEMA = pa.schema([
+    ("driver_id",     pa.string()),
+    ("score",         pa.float64()),
+    ("total_count",   pa.int64()),
+    ("last_updated",  pa.timestamp("us")),
+    ("last_alert_at", pa.timestamp("us")),
+])
+
+_PART_RE = re.compile(r"^part-(\d+)-(\d+)\.parquet$")
+
+
+def _staging(path: Path) -> Path:
+    # Dot-prefixed, so dataset readers skip it until the rename
+    return path.with_name(f".{path.name}.tmp")
+
+
+def _parse_timestamp(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    # Stored as naive UTC, like datetime.utcnow() everywhere else
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+
+def _to_table(rows: list, schema: pa.Schema) -> pa.Table:
+    timestamps = [f.name for f in schema if pa.types.is_timestamp(f.type)]
+    for row in rows:
+        for name in timestamps:
+            if isinstance(row.get(name), str):
+                row[name] = _parse_timestamp(row[name])
+    return pa.Table.from_pylist(rows, schema=schema)
+
+
+def _partitions(table: pa.Table):
+    """Split one batch into (day, entity_type) slices."""
+    days = pc.strftime(table.column("created_at"), format="%Y-%m-%d")
+    entity_types = pc.fill_null(table.column("entity_type"), "unknown")
+    for day, entity_type in sorted(set(zip(days.to_pylist(), entity_types.to_pylist()))):
+        mask = pc.and_(pc.equal(days, day), pc.equal(entity_types, entity_type))
+        yield day, entity_type, table.filter(mask)
+
+
+# ─── Parquet sink ────────────────────────────────────────────────────────────
+def _part_name(first_id: int, last_id: int) -> str:
+    # Zero-padded so name order is id order
+    return f"part-{first_id:012d}-{last_id:012d}.parquet"
+
+
+def _id_range(path: Path) -> tuple:
+    m = _PART_RE.match(path.name)
+    return int(m.group(1)), int(m.group(2))
+
+
+def _drop_covered(files: list) -> list:
+    # A file whose id range sits inside another's was already merged by a
+    # compaction that stopped before deleting it
+    kept, reach = [], -1
+    for path in sorted(files, key=lambda p: (_id_range(p)[0], -_id_range(p)[1])):
+        if _id_range(path)[1] <= reach:
+            path.unlink()
+            continue
+        kept.append(path)
+        reach = _id_range(path)[1]
+    return kept
+
+
+class ParquetSink:
+    """
+    <root>/feedback/day=YYYY-MM-DD/entity_type=<type>/part-<first id>-<last id>.parquet
+    <root>/driver_sentiment/snapshot_date=YYYY-MM-DD/part-0.parquet
+    Read with pyarrow.dataset / DuckDB / Spark using Hive partitioning.
+    """
+
+    def __init__(self, root: Path = EXPORT_DIR):
+        self.root = Path(root)
+        self._state_path = self.root / "_state.json"
+
+    def feedback_watermark(self) -> int:
+        try:
+            return json.loads(self._state_path.read_text())["feedback_last_id"]
+        except FileNotFoundError:
+            return 0
+
+    def append_feedback(self, table: pa.Table, last_id: int):
+        for day, entity_type, part in _partitions(table):
+            directory = self.root / "feedback" / f"day={day}" / f"entity_type={entity_type}"
+            ids = part.column("id")
+            # Same rows → same file name, so a rerun after a crash overwrites
+            # instead of duplicating
+            target = directory / _part_name(pc.min(ids).as_py(), pc.max(ids).as_py())
+            self._write(part.drop_columns(["entity_type"]), target)
+        # Only after the data is on disk
+        self._replace_json(self._state_path, {"feedback_last_id": last_id})
+
+    def has_driver_snapshot(self, day: date) -> bool:
+        return (self.root / "driver_sentiment" / f"snapshot_date={day}").is_dir()
+
+    def write_driver_snapshot(self, day: date, batches) -> int:
+        directory = self.root / "driver_sentiment" / f"snapshot_date={day}"
+        staging = _staging(directory)
+        staging.mkdir(parents=True, exist_ok=True)
+        rows = 0
+        with pq.ParquetWriter(staging / "part-0.parquet", DRIVER_SCHEMA) as writer:
+            for batch in batches:
+                writer.write_table(batch)
+                rows += batch.num_rows
+        if directory.exists():
+            for old in directory.iterdir():
+                old.unlink()
+            directory.rmdir()
+        os.replace(staging, directory)
+        return rows
+
+    def compact(self, min_files: int = COMPACT_MIN_FILES) -> int:
+        """Merge each partition's part files into one. Returns partitions compacted."""
+        compacted = 0
+        for directory in sorted((self.root / "feedback").glob("day=*/entity_type=*")):
+            files = _drop_covered([p for p in directory.iterdir() if _PART_RE.match(p.name)])
+            if len(files) < min_files:
+                continue
+            target = directory / _part_name(_id_range(files[0])[0], _id_range(files[-1])[1])
+            staging = _staging(target)
+            schema = pq.read_schema(files[0])
+            with pq.ParquetWriter(staging, schema) as writer:
+                pending, buffered = [], 0
+                for path in files:
+                    for batch in pq.ParquetFile(path).iter_batches():
+                        pending.append(batch)
+                        buffered += batch.num_rows
+                        if buffered >= COMPACT_ROW_GROUP:
+                            writer.write_table(pa.Table.from_batches(pending, schema))
+                            pending, buffered = [], 0
+                if pending:
+                    writer.write_table(pa.Table.from_batches(pending, schema))
+            # Rename first, delete second — a crash in between is cleaned up
+            # by _drop_covered on the next run
+            os.replace(staging, target)
+            for path in files:
+                if path != target:
+                    path.unlink()
+            compacted += 1
+        return compacted
+
+    def _write(self, table: pa.Table, target: Path):
+        target.parent.mkdir(parents=True, exist_ok=True)
+        staging = _staging(target)
+        pq.write_table(table, staging)
+        os.replace(staging, target)
+
+    def _replace_json(self, path: Path, doc: dict):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = _staging(path)
+        staging.write_text(json.dumps(doc))
+        os.replace(staging, path)
+
+
+# ─── Iceberg sink ────────────────────────────────────────────────────────────
+class IcebergSink:
+    """
+    Tables <namespace>.feedback (partitioned by day(created_at), entity_type)
+    and <namespace>.driver_sentiment (partitioned by snapshot_date).
+    The feedback watermark is a table property committed in the same
+    transaction as the rows, so an append and its watermark land together.
+    """
+
+    def __init__(self, catalog=None, namespace: str = ICEBERG_NAMESPACE):
+        # Optional dependency — only needed with EXPORT_FORMAT=iceberg
+        from pyiceberg.catalog import load_catalog
+        from pyiceberg.transforms import DayTransform, IdentityTransform
+
+        self.catalog = catalog or load_catalog(ICEBERG_CATALOG)
+        self.catalog.create_namespace_if_not_exists(namespace)
+        self.feedback = self._table(namespace, "feedback", FEEDBACK_SCHEMA, [
+            ("created_at", DayTransform(), "day"),
+            ("entity_type", IdentityTransform(), "entity_type"),
+        ])
+        self.drivers = self._table(
+            namespace, "driver_sentiment", DRIVER_SCHEMA.append(pa.field("snapshot_date", pa.date32())),
+            [("snapshot_date", IdentityTransform(), "snapshot_date")],
+        )
+
+    def feedback_watermark(self) -> int:
+        return int(self.feedback.properties.get(WATERMARK_PROPERTY, 0))
+
+    def append_feedback(self, table: pa.Table, last_id: int):
+        with self.feedback.transaction() as tx:
+            tx.append(table)
+            tx.set_properties({WATERMARK_PROPERTY: str(last_id)})
+
+    def has_driver_snapshot(self, day: date) -> bool:
+        from pyiceberg.expressions import EqualTo
+        scan = self.drivers.scan(row_filter=EqualTo("snapshot_date", day.isoformat()), limit=1)
+        return scan.to_arrow().num_rows > 0
+
+    def write_driver_snapshot(self, day: date, batches) -> int:
+        from pyiceberg.expressions import EqualTo
+        rows = 0
+        with self.drivers.transaction() as tx:
+            tx.delete(EqualTo("snapshot_date", day.isoformat()))
+            for batch in batches:
+                tx.append(batch.append_column("snapshot_date", pa.array([day] * batch.num_rows, pa.date32())))
+                rows += batch.num_rows
+        return rows
+
+    def compact(self, min_files: int = COMPACT_MIN_FILES) -> int:
+        """
+        Rewrite each partition with at least `min_files` data files as one
+        overwrite. Memory is bounded by the largest single partition.
+        """
+        from pyiceberg.expressions import And, EqualTo, GreaterThanOrEqual, LessThan
+
+        counts: dict = {}
+        for partition in self.feedback.inspect.files().column("partition").to_pylist():
+            key = (partition["day"], partition["entity_type"])
+            counts[key] = counts.get(key, 0) + 1
+
+        compacted = 0
+        for (day, entity_type), files in sorted(counts.items()):
+            if files < min_files:
+                continue
+            if isinstance(day, int):      # days since epoch in older pyiceberg
+                day = date(1970, 1, 1) + timedelta(days=day)
+            start = datetime.combine(day, datetime.min.time())
+            partition_filter = And(
+                GreaterThanOrEqual("created_at", start.isoformat()),
+                LessThan("created_at", (start + timedelta(days=1)).isoformat()),
+                EqualTo("entity_type", entity_type),
+            )
+            rows = self.feedback.scan(row_filter=partition_filter).to_arrow()
+            with self.feedback.transaction() as tx:
+                tx.overwrite(rows.cast(FEEDBACK_SCHEMA), overwrite_filter=partition_filter)
+            compacted += 1
+        return compacted
+
+    def _table(self, namespace: str, name: str, schema: pa.Schema, partitioning: list):
+        table = self.catalog.create_table_if_not_exists(f"{namespace}.{name}", schema=schema)
+        if table.spec().is_unpartitioned():
+            with table.update_spec() as spec:
+                for column, transform, field_name in partitioning:
+                    spec.add_field(column, transform, field_name)
+        return table
+
+
+# ─── Job ─────────────────────────────────────────────────────────────────────
+class FeedbackExportJob:
+
+    def __init__(self, sink, batch_size: int = EXPORT_BATCH_SIZE, safety_lag: float = EXPORT_SAFETY_LAG):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.safety_lag = safety_lag
+        self.feedback_repo = FeedbackRepository()
+        self.driver_repo = DriverRepository()
+
+    def export_feedback(self) -> int:
+        """Append every feedback row past the watermark. Returns rows exported."""
+        last_id = self.sink.feedback_watermark()
+        cutoff = (datetime.utcnow() - timedelta(seconds=self.safety_lag)).isoformat()
+        exported = 0
+        while True:
+            rows = self.feedback_repo.list_after(last_id, created_before=cutoff, limit=self.batch_size)
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            self.sink.append_feedback(_to_table(rows, FEEDBACK_SCHEMA), last_id)
+            exported += len(rows)
+            if len(rows) < self.batch_size:
+                break
+        return exported
+
+    def snapshot_drivers(self, day: date = None, force: bool = False) -> int | None:
+        """Today's driver_sentiment snapshot; None if it already exists."""
+        day = day or datetime.utcnow().date()
+        if not force and self.sink.has_driver_snapshot(day):
+            return None
+        return self.sink.write_driver_snapshot(day, self._driver_pages())
+
+    def run(self, snapshot: bool = True, compact: bool = False) -> dict:
+        summary = {"feedback_rows": self.export_feedback()}
+        if snapshot:
+            summary["driver_snapshot_rows"] = self.snapshot_drivers()
+        if compact:
+            summary["partitions_compacted"] = self.sink.compact()
+        logger.warning("Export finished: %s", summary)
+        return summary
+
+    def _driver_pages(self):
+        after = None
+        while True:
+            rows = self.driver_repo.list_drivers_page(after, limit=self.batch_size)
+            if not rows:
+                return
+            after = rows[-1]["driver_id"]
+            yield _to_table(rows, DRIVER_SCHEMA)
+            if len(rows) < self.batch_size:
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export feedback history to Parquet or Iceberg")
+    parser.add_argument("--format", choices=("parquet", "iceberg"), default=EXPORT_FORMAT)
+    parser.add_argument("--dir", default=str(EXPORT_DIR), help="output directory (parquet)")
+    parser.add_argument("--compact", action="store_true", help="merge small files afterwards")
+    parser.add_argument("--no-snapshot", action="store_true", help="skip the daily driver_sentiment snapshot")
+    args = parser.parse_args()
+
+    sink = ParquetSink(Path(args.dir)) if args.format == "parquet" else IcebergSink()
+    summary = FeedbackExportJob(sink).run(snapshot=not args.no_snapshot, compact=args.compact)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+"""
+feedback_log.py
+────────────────
+Local append-only store of processed feedback, behind
+GET /driver/{driver_id}/feedback:
+  - process_feedback appends every stored row to this process's active
+    segment (one JSON line per feedback)
+  - Segments roll over at FEEDBACK_LOG_SEGMENT_BYTES or after
+    FEEDBACK_LOG_SEGMENT_SECONDS; sealed ones are zstd-compressed in the
+    background and deleted after FEEDBACK_LOG_RETENTION_HOURS
+  - An in-memory index maps driver_id → feedback ids (time order) with
+    the segment, offset and label of each, so a page is a bisect plus a
+    few slice reads — the feedback table is never scanned
+
+Every worker sharing FEEDBACK_LOG_DIR writes its own segments (host + pid
+in the name) and tails the others' when it serves a read, so any worker
+answers for everything the host has processed. Ids below floor() may be
+missing locally — the caller pages those from Supabase.
+"""
+
+import bisect
+import json
+import os
+import socket
+import threading
+import time
+from array import array
+
+import zstandard
+
+from app.logger import logger
+from app.utils.lru_cache import LRUCache
+
+# Unset → local store disabled; history is read from Supabase
+FEEDBACK_LOG_DIR             = os.getenv("FEEDBACK_LOG_DIR")
+FEEDBACK_LOG_RETENTION_HOURS = float(os.getenv("FEEDBACK_LOG_RETENTION_HOURS", 24))
+FEEDBACK_LOG_SEGMENT_BYTES   = int(os.getenv("FEEDBACK_LOG_SEGMENT_BYTES", 8 * 1024 * 1024))
+FEEDBACK_LOG_SEGMENT_SECONDS = float(os.getenv("FEEDBACK_LOG_SEGMENT_SECONDS", 3600))
+
+# How stale other workers' appends may be when serving a read
+REFRESH_SECONDS      = 1.0
+MAINTENANCE_INTERVAL = 60.0
+
+# Columns kept per feedback — same names as the feedback table
+FIELDS = (
+    "id", "driver_id", "trip_id", "text", "sentiment", "sentiment_label",
+    "entity_type", "external_feedback_id", "lexicon_version", "created_at",
+)
+LABELS = ("negative", "neutral", "positive")
+
+_FLOOR_PREFIX = "_floor-"
+
+
+def _segment_started(name: str) -> float:
+    # seg-<first write, epoch ms>-<host>-<pid>
+    return int(name.split("-", 2)[1]) / 1000
+
+
+class _Segment:
+    __slots__ = ("no", "name", "offset", "first_id", "last_id", "last_ts", "complete")
+
+    def __init__(self, no: int, name: str):
+        self.no = no
+        self.name = name
+        self.offset = 0           # bytes indexed so far (uncompressed)
+        self.first_id = None
+        self.last_id = None
+        self.last_ts = None
+        self.complete = False     # sealed and fully indexed — never re-read
+
+
+class _DriverIndex:
+    """Parallel arrays sorted by feedback id — ~25 bytes per feedback."""
+    __slots__ = ("ids", "segments", "offsets", "lengths", "labels")
+
+    def __init__(self):
+        self.ids      = array("q")
+        self.segments = array("I")
+        self.offsets  = array("Q")
+        self.lengths  = array("I")
+        self.labels   = array("b")
+
+    def add(self, feedback_id: int, segment: int, offset: int, length: int, label: int):
+        # Concurrent workers can finish out of id order; almost always an append
+        pos = bisect.bisect(self.ids, feedback_id)
+        for column, value in zip(
+            (self.ids, self.segments, self.offsets, self.lengths, self.labels),
+            (feedback_id, segment, offset, length, label),
+        ):
+            column.insert(pos, value)
+
+    def drop_below(self, feedback_id: int):
+        cut = bisect.bisect_left(self.ids, feedback_id)
+        if cut:
+            for column in (self.ids, self.segments, self.offsets, self.lengths, self.labels):
+                del column[:cut]
+
+
+class FeedbackLog:
+
+    def __init__(self, path: str = FEEDBACK_LOG_DIR,
+                 retention_hours: float = FEEDBACK_LOG_RETENTION_HOURS,
+                 segment_bytes: int = FEEDBACK_LOG_SEGMENT_BYTES,
+                 segment_seconds: float = FEEDBACK_LOG_SEGMENT_SECONDS):
+        self.path = path
+        self.retention = retention_hours * 3600
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self._lock = threading.Lock()
+        self._segments: dict = {}         # name → _Segment
+        self._by_no: list = []            # segment number → name
+        self._drivers: dict = {}          # driver_id → _DriverIndex
+        self._marker_floor = 0
+        self._active = None               # (_Segment, file) this process appends to
+        self._active_started = 0.0
+        self._own_sealed: set = set()
+        self._last_refresh = 0.0
+        self._decompressed = LRUCache(4)  # sealed segment name → bytes
+        self._worker = None
+        self._stop = threading.Event()
+        if self.enabled:
+            os.makedirs(self.path, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    # ─── Writes ──────────────────────────────────────────────────────────────
+    def append(self, row: dict, now: float = None):
+        """row: a stored feedback row, at least id + driver_id + sentiment_label."""
+        if not self.enabled:
+            return
+        now = time.time() if now is None else now
+        record = {field: row.get(field) for field in FIELDS}
+        record["ts"] = now
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+        with self._lock:
+            if self._active is None:
+                self._open_segment(now)
+            segment, f = self._active
+            f.write(line)
+            f.flush()
+            self._index(segment, record, segment.offset, len(line))
+            segment.offset += len(line)
+            if segment.offset >= self.segment_bytes:
+                self._roll()
+
+    def mark_missing(self, feedback_id: int):
+        """
+        A stored row that never made it into the log. Raise the floor past it
+        so reads at or below it go to Supabase instead of skipping the row.
+        """
+        if not self.enabled:
+            return
+        try:
+            open(os.path.join(self.path, f"{_FLOOR_PREFIX}{feedback_id + 1:012d}"), "ab").close()
+        except OSError as e:
+            # Other workers keep their own floor; this one still reads around the gap
+            logger.error("Feedback log floor marker for %s not written: %s", feedback_id, e)
+        with self._lock:
+            self._set_marker_floor(feedback_id + 1)
+
+    # ─── Reads ───────────────────────────────────────────────────────────────
+    def page(self, driver_id: str, before_id: int = None, label: str = None, limit: int = 20) -> list:
+        """Newest first, ids < before_id, at most `limit` rows."""
+        if not self.enabled:
+            return []
+        self._refresh()
+        wanted = LABELS.index(label) if label else None
+        floor = self.floor()
+
+        with self._lock:
+            index = self._drivers.get(driver_id)
+            if index is None:
+                return []
+            pos = len(index.ids) if before_id is None else bisect.bisect_left(index.ids, before_id)
+            locations = []
+            while pos > 0 and len(locations) < limit:
+                pos -= 1
+                if floor is not None and index.ids[pos] < floor:
+                    break
+                if wanted is None or index.labels[pos] == wanted:
+                    locations.append((self._by_no[index.segments[pos]], index.offsets[pos], index.lengths[pos]))
+
+        rows = []
+        for name, offset, length in locations:
+            data = self._read(name, offset, length)
+            # None: the segment expired between the index lookup and the read
+            if data is not None:
+                record = json.loads(data)
+                record.pop("ts", None)
+                rows.append(record)
+        return rows
+
+    def floor(self) -> int | None:
+        """Smallest feedback id the local store is complete from; None → nothing local."""
+        with self._lock:
+            firsts = [s.first_id for s in self._segments.values() if s.first_id is not None]
+        if not firsts:
+            return self._marker_floor or None
+        return max(self._marker_floor, min(firsts))
+
+    # ─── Background upkeep ───────────────────────────────────────────────────
+    def maintain(self, now: float = None):
+        """Roll an old active segment, compress sealed ones, expire old ones."""
+        if not self.enabled:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            if self._active is not None and now - self._active_started >= self.segment_seconds:
+                self._roll()
+        self._refresh(force=True)
+        self._compress_sealed(now)
+        self._expire(now)
+
+    def start(self, interval: float = MAINTENANCE_INTERVAL):
+        if not self.enabled or self._worker is not None:
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._maintain_loop, args=(interval,), name="feedback-log", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout=1)
+            self._worker = None
+        with self._lock:
+            if self._active is not None:
+                self._roll()
+
+    def _maintain_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.maintain()
+            except Exception as e:
+                logger.error("Feedback log maintenance failed: %s", e, exc_info=True)
+
+    # ─── internals ───────────────────────────────────────────────────────────
+    def _open_segment(self, now: float):
+        # Caller holds self._lock
+        name = f"seg-{int(now * 1000):013d}-{socket.gethostname()}-{os.getpid()}"
+        segment = self._register(name)
+        self._active = (segment, open(os.path.join(self.path, name + ".log"), "ab"))
+        self._active_started = now
+
+    def _roll(self):
+        # Caller holds self._lock; the next append opens a fresh segment
+        segment, f = self._active
+        f.close()
+        segment.complete = True
+        self._own_sealed.add(segment.name)
+        self._active = None
+
+    def _register(self, name: str) -> _Segment:
+        segment = self._segments.get(name)
+        if segment is None:
+            segment = _Segment(len(self._by_no), name)
+            self._by_no.append(name)
+            self._segments[name] = segment
+        return segment
+
+    def _index(self, segment: _Segment, record: dict, offset: int, length: int):
+        feedback_id = record["id"]
+        if segment.first_id is None or feedback_id < segment.first_id:
+            segment.first_id = feedback_id
+        if segment.last_id is None or feedback_id > segment.last_id:
+            segment.last_id = feedback_id
+        segment.last_ts = max(segment.last_ts or 0, record["ts"])
+        label = record.get("sentiment_label")
+        self._drivers.setdefault(record["driver_id"], _DriverIndex()).add(
+            feedback_id, segment.no, offset, length, LABELS.index(label) if label in LABELS else 1
+        )
+
+    def _refresh(self, force: bool = False):
+        # Picks up segments other workers wrote since the last look
+        if not force and time.time() - self._last_refresh < REFRESH_SECONDS:
+            return
+        self._last_refresh = time.time()
+
+        # Listed under the lock, so a segment this process rolls meanwhile
+        # can't look deleted
+        with self._lock:
+            names, markers = set(), [self._marker_floor]
+            for entry in os.listdir(self.path):
+                if entry.startswith(_FLOOR_PREFIX):
+                    markers.append(int(entry[len(_FLOOR_PREFIX):]))
+                elif entry.startswith("seg-") and entry.endswith((".log", ".log.zst")):
+                    names.add(entry.split(".", 1)[0])
+
+            active = self._active[0].name if self._active is not None else None
+            for name in sorted(names):
+                if name == active:
+                    continue
+                segment = self._register(name)
+                if segment.complete:
+                    continue
+                data, segment.complete = self._tail(name, segment.offset)
+                if not data:
+                    continue
+                # A writer may be mid-line; index complete lines only
+                end = data.rfind(b"\n") + 1
+                offset = segment.offset
+                for line in data[:end].splitlines(keepends=True):
+                    self._index(segment, json.loads(line), offset, len(line))
+                    offset += len(line)
+                segment.offset = offset
+
+            # Segments another worker expired
+            for name in [n for n in self._segments if n not in names and n != active]:
+                del self._segments[name]
+            self._set_marker_floor(max(markers))
+
+    def _tail(self, name: str, offset: int) -> tuple:
+        """(bytes past offset, whether the segment is compressed and so final)"""
+        try:
+            with open(os.path.join(self.path, name + ".log"), "rb") as f:
+                f.seek(offset)
+                return f.read(), False
+        except FileNotFoundError:
+            data = self._sealed_bytes(name)
+            return (data[offset:], True) if data is not None else (None, False)
+
+    def _read(self, name: str, offset: int, length: int) -> bytes | None:
+        try:
+            with open(os.path.join(self.path, name + ".log"), "rb") as f:
+                return os.pread(f.fileno(), length, offset)
+        except FileNotFoundError:
+            data = self._sealed_bytes(name)
+            return data[offset:offset + length] if data is not None else None
+
+    def _sealed_bytes(self, name: str) -> bytes | None:
+        data = self._decompressed.get(name)
+        if data is None:
+            try:
+                with open(os.path.join(self.path, name + ".log.zst"), "rb") as f:
+                    data = zstandard.ZstdDecompressor().decompress(f.read())
+            except FileNotFoundError:
+                return None
+            self._decompressed.put(name, data)
+        return data
+
+    def _compress_sealed(self, now: float):
+        # Our own rolled segments right away; anyone's once it is older than
+        # an active segment can be (its writer is gone)
+        abandoned = now - self.segment_seconds - 2 * MAINTENANCE_INTERVAL
+        with self._lock:
+            active = self._active[0].name if self._active is not None else None
+        for entry in os.listdir(self.path):
+            if not (entry.startswith("seg-") and entry.endswith(".log")):
+                continue
+            name = entry[:-len(".log")]
+            if name == active or (name not in self._own_sealed and _segment_started(name) >= abandoned):
+                continue
+            plain = os.path.join(self.path, entry)
+            try:
+                with open(plain, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue       # another worker compressed it first
+            tmp = f"{plain}.zst.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(zstandard.ZstdCompressor(level=3).compress(data))
+            os.replace(tmp, plain + ".zst")
+            try:
+                os.remove(plain)
+            except FileNotFoundError:
+                pass
+            self._own_sealed.discard(name)
+
+    def _expire(self, now: float):
+        cutoff = now - self.retention
+        with self._lock:
+            active = self._active[0].name if self._active is not None else None
+            expired = [
+                s for s in self._segments.values()
+                if s.name != active and (s.last_ts or _segment_started(s.name)) < cutoff
+            ]
+        for segment in expired:
+            if segment.last_id is not None:
+                # Marker first: from here on ids up to last_id come from Supabase
+                open(os.path.join(self.path, f"{_FLOOR_PREFIX}{segment.last_id + 1:012d}"), "ab").close()
+                with self._lock:
+                    self._set_marker_floor(segment.last_id + 1)
+            for suffix in (".log", ".log.zst"):
+                try:
+                    os.remove(os.path.join(self.path, segment.name + suffix))
+                except FileNotFoundError:
+                    pass
+            with self._lock:
+                self._segments.pop(segment.name, None)
+        if expired:
+            self._clean_markers()
+            logger.info("Feedback log expired %d segments", len(expired))
+
+    def _set_marker_floor(self, floor: int):
+        # Caller holds self._lock
+        if floor > self._marker_floor:
+            self._marker_floor = floor
+            for index in self._drivers.values():
+                index.drop_below(floor)
+
+    def _clean_markers(self):
+        markers = sorted(e for e in os.listdir(self.path) if e.startswith(_FLOOR_PREFIX))
+        for marker in markers[:-1]:
+            try:
+                os.remove(os.path.join(self.path, marker))
+            except FileNotFoundError:
+                pass
+
+
+feedback_log = FeedbackLog()
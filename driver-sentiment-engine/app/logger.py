@@ -1,8 +1,118 @@
+"""
+logger.py
+──────────
+Non-blocking, structured logging:
+  - Callers only enqueue records; formatting and I/O run on a listener thread
+  - JSON lines with driver_id / trace_id fields (LOG_FORMAT=text for humans)
+  - Repetitive per-feedback INFO lines (extra={"sample": True}) are kept at
+    LOG_SAMPLE_RATE; warnings, errors and alerts are always kept
+"""
+
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+LOG_LEVEL       = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT      = os.getenv("LOG_FORMAT", "json").lower()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 1.0))
+
+# Fields copied from the logging context onto every record
+CONTEXT_FIELDS = ("driver_id", "trace_id")
+
+_log_context: ContextVar[dict] = ContextVar("log_context", default={})
+
+
+@contextmanager
+def log_context(**fields):
+    """Attach fields (driver_id, trace_id, ...) to every record logged inside the block."""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    # Runs in the caller's thread, so the context is captured before queueing
+    def filter(self, record: logging.LogRecord) -> bool:
+        ctx = _log_context.get()
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, ctx.get(field))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not getattr(record, "sample", False):
+            return True
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # The stock prepare() formats the message in the caller's thread.
+    # Hand the raw record over instead; the listener formats it.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts":     self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level":  record.levelname,
+            "msg":    record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        driver_id = getattr(record, "driver_id", None)
+        prefix = f"[{driver_id}] " if driver_id else ""
+        return f"{record.asctime} | {record.levelname} | {prefix}{record.message}"
+
+    def usesTime(self) -> bool:
+        return True
+
+
+def _build_logger() -> logging.Logger:
+    stream = logging.StreamHandler()
+    stream.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
+    handler.addFilter(ContextFilter())
+
+    listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)   # flush what's queued on shutdown
+
+    log = logging.getLogger(__name__)
+    log.setLevel(LOG_LEVEL)
+    log.addHandler(handler)
+    log.propagate = False
+    return log
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s"
-)
 
-logger = logging.getLogger(__name__)
\ No newline at end of file
+logger = _build_logger()
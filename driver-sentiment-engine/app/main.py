@@ -1,15 +1,65 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+import hmac
+import threading
+from contextlib import asynccontextmanager
+from typing import Literal
+
+from fastapi import FastAPI, HTTPException, Request, Depends, Header, Query
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.services.sentiment_service import SentimentService
 from app.services.driver_service import DriverService
 from app.services.alert_service import AlertService
-from app.processing_tasks import process_feedback
-from app.models import FeedbackRequest
-from app.config import supabase
+from app.services.feedback_history_service import FeedbackHistoryService
+from app.processing_tasks import (
+    process_feedback, drivers_snapshot, feedback_rpc_enabled, seen_feedback_ids, rule_engine
+)
+from app.repositories.feedback_repository import FeedbackRepository
+from app.scheduler import FeedbackScheduler
+from app.models import FeedbackRequest, ProfilingRequest, LexiconReloadRequest
+from app.config import ADMIN_TOKEN
+from app.profiling import profiler
+from app.tracing import trace, current_trace_id, TRACE_HEADER
+from app.utils.lexicon import lexicons, LexiconError
+from app.warm_state import warm_state
+from app.feedback_log import feedback_log
+from app.logger import logger
+
+scheduler = FeedbackScheduler(process_feedback)
+
+# Set once warm-up is done; GET /ready answers 503 until then
+ready = threading.Event()
+
+
+def _warm_up():
+    try:
+        lexicons.current          # builds the VADER analyzer for the live lexicon
+        warm_state.restore()
+        warm_state.start()
+        feedback_log.maintain()   # indexes the segments already on disk
+    except Exception as e:
+        logger.error("Warm-up failed, starting cold: %s", e, exc_info=True)
+    finally:
+        ready.set()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    scheduler.start()
+    lexicons.start_watching()
+    rule_engine.start()
+    feedback_log.start()
+    # In the background, so /health answers while the worker warms up
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+    yield
+    lexicons.stop_watching()
+    rule_engine.stop()
+    scheduler.stop()
+    feedback_log.stop()
+    warm_state.stop()           # after the queue drains, so the snapshot is complete
+
 
-app = FastAPI(title="Driver Sentiment Engine", version="1.0.0")
+app = FastAPI(title="Driver Sentiment Engine", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +72,24 @@ app.add_middleware(
 sentiment_service = SentimentService()
 driver_service    = DriverService()
 alert_service     = AlertService()
+feedback_repo     = FeedbackRepository()
+feedback_history  = FeedbackHistoryService()
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    # Honour an upstream ID so a client can correlate its own logs
+    with trace(request.headers.get(TRACE_HEADER)) as trace_id:
+        response = await call_next(request)
+    response.headers[TRACE_HEADER] = trace_id
+    return response
+
+
+def require_admin(x_admin_token: str | None = Header(default=None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
 
 
 @app.get("/health")
@@ -29,23 +97,34 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def readiness_check():
+    if not ready.is_set():
+        return JSONResponse(status_code=503, content={"status": "warming"})
+    return {"status": "ready"}
+
+
 @app.post("/feedback", status_code=202)
-def submit_feedback(feedback: FeedbackRequest, background_tasks: BackgroundTasks):
-    # Idempotency check
-    if feedback.external_feedback_id:
-        existing = supabase.table("feedback") \
-            .select("id") \
-            .eq("external_feedback_id", feedback.external_feedback_id) \
-            .execute()
-        if existing.data:
-            return JSONResponse(status_code=200, content={
-                "success": True,
-                "message": "Duplicate feedback ignored",
-                "data": None, "error": None
-            })
-
-    background_tasks.add_task(process_feedback, feedback)
-    return {"success": True, "message": "Feedback accepted for processing", "data": None, "error": None}
+def submit_feedback(feedback: FeedbackRequest):
+    # Idempotency check — recently stored IDs are answered from memory; the
+    # RPC path dedupes inside its transaction instead of querying here
+    external_id = feedback.external_feedback_id
+    if external_id and (external_id in seen_feedback_ids or (
+            not feedback_rpc_enabled() and feedback_repo.exists(external_id))):
+        return JSONResponse(status_code=200, content={
+            "success": True,
+            "message": "Duplicate feedback ignored",
+            "data": None, "error": None
+        })
+
+    trace_id = current_trace_id()
+    scheduler.submit(feedback, trace_id=trace_id)
+    return {
+        "success": True,
+        "message": "Feedback accepted for processing",
+        "data": {"trace_id": trace_id},
+        "error": None
+    }
 
 
 @app.get("/driver/{driver_id}")
@@ -70,13 +149,89 @@ def get_driver(driver_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/driver/{driver_id}/feedback")
+def get_driver_feedback(
+    driver_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: int | None = None,
+    label: Literal["positive", "neutral", "negative"] | None = None,
+):
+    try:
+        page = feedback_history.list(driver_id, cursor=cursor, label=label, limit=limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "success":     True,
+        "data":        page["items"],
+        "next_cursor": page["next_cursor"],
+        "source":      page["source"],
+    }
+
+
 @app.get("/drivers")
-def get_all_drivers():
+def get_all_drivers(request: Request):
     try:
-        res = supabase.table("driver_sentiment") \
-            .select("*") \
-            .order("score", desc=False) \
-            .execute()
-        return {"success": True, "data": res.data}
+        snapshot = drivers_snapshot.get()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+    headers = {"ETag": snapshot.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if snapshot.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+
+    encoding, body = snapshot.encode_for(request.headers.get("accept-encoding"))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/metrics/scheduler")
+def get_scheduler_metrics():
+    return {"success": True, "data": scheduler.stats()}
+
+
+@app.get("/metrics/rules")
+def get_rule_metrics():
+    return {"success": True, "data": rule_engine.stats()}
+
+
+@app.post("/admin/profiling/start", dependencies=[Depends(require_admin)])
+def start_profiling(req: ProfilingRequest):
+    try:
+        profiler.start(
+            sample_every=req.sample_every,
+            duration_seconds=req.duration_seconds,
+            interval_ms=req.interval_ms
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"success": True, "data": profiler.report(limit=0)}
+
+
+@app.post("/admin/profiling/stop", dependencies=[Depends(require_admin)])
+def stop_profiling():
+    profiler.stop()
+    return {"success": True, "data": profiler.report()}
+
+
+@app.get("/admin/profiling", dependencies=[Depends(require_admin)])
+def get_profiling_report(limit: int = 500):
+    return {"success": True, "data": profiler.report(limit=limit)}
+
+
+@app.get("/admin/lexicon", dependencies=[Depends(require_admin)])
+def get_lexicon():
+    return {
+        "success": True,
+        "data": {"version": lexicons.current.version, "available": lexicons.available_versions()}
+    }
+
+
+@app.post("/admin/lexicon/reload", dependencies=[Depends(require_admin)])
+def reload_lexicon(req: LexiconReloadRequest):
+    # Reloads this worker only; the others pick new files up via the watcher
+    try:
+        lex = lexicons.reload(req.version)
+    except LexiconError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "data": {"version": lex.version}}
@@ -7,4 +7,14 @@ class FeedbackRequest(BaseModel):
     trip_id: str
     text: str
     entity_type: Literal["driver", "trip", "app", "marshal"] = "driver"
-    external_feedback_id: str | None = None
\ No newline at end of file
+    external_feedback_id: str | None = None
+
+
+class ProfilingRequest(BaseModel):
+    sample_every: int = 10                 # profile 1 in N feedback runs
+    duration_seconds: float | None = 60    # stop automatically; None = until stopped
+    interval_ms: float = 5.0               # stack sampling interval
+
+
+class LexiconReloadRequest(BaseModel):
+    version: str | None = None             # None → pinned / newest file
@@ -1,19 +1,87 @@
+import os
 import time
 import threading
-from app.services.sentiment_service import SentimentService
-from app.services.driver_service import DriverService
-from app.services.alert_service import AlertService
-from app.config import supabase
-from app.logger import logger
+from datetime import datetime
+from app.services.sentiment_service import SentimentService, analysis_cache
+from app.utils.lexicon import lexicons
+from app.services.driver_service import DriverService, ALPHA
+from app.services.alert_service import AlertService, THRESHOLD_5
+from app.services.snapshot_service import DriverSnapshotService
+from app.services.rule_engine import FleetState, RuleEngine
+from app.repositories.feedback_repository import FeedbackRepository
+from app.config import supabase, COOLDOWN_HOURS, USE_FEEDBACK_RPC
+from postgrest.exceptions import APIError
+from app.logger import logger, log_context
+from app.profiling import profiler
+from app.tracing import traced, current_trace_id
+from app.utils.lru_cache import LRUCache
+from app.warm_state import warm_state
+from app.feedback_log import feedback_log
 
 # Service singletons
 _sentiment_service = SentimentService()
 _driver_service = DriverService()
 _alert_service = AlertService()
+_feedback_repo = FeedbackRepository()
+
+# Shared with GET /drivers — marked dirty whenever a score or alert changes
+drivers_snapshot = DriverSnapshotService()
+
+# Fleet-wide score/label history for the periodic alert-rule sweep
+fleet_state = FleetState()
+rule_engine = RuleEngine(fleet_state, _alert_service)
+
+# external_feedback_ids known to be stored — lets intake answer a replay
+# without querying the feedback table
+SEEN_IDS_SIZE = int(os.getenv("SEEN_IDS_SIZE", 100000))
+seen_feedback_ids = LRUCache(SEEN_IDS_SIZE)
+
+# Carried across restarts by the warm-state snapshot
+def _load_analysis(rows):
+    # Only results scored by the exact lexicon now live; the rest would miss anyway
+    lex = lexicons.current
+    analysis_cache.load(
+        ((digest, text), {"score": score, "raw_score": raw, "label": label, "lexicon_version": lex.version})
+        for digest, text, score, raw, label in rows
+        if digest == lex.digest
+    )
+
+
+warm_state.register(
+    "analysis",
+    dump=lambda: [[digest, text, r["score"], r["raw_score"], r["label"]]
+                  for (digest, text), r in analysis_cache.items()],
+    load=_load_analysis,
+)
+warm_state.register(
+    "drivers",
+    dump=lambda: [[driver_id, score, count] for driver_id, (score, count) in _driver_service.cache.items()],
+    load=lambda rows: _driver_service.cache.load((d, (score, count)) for d, score, count in rows),
+)
+warm_state.register(
+    "cooldown",
+    dump=_alert_service.cooldown.dump,
+    load=lambda rows: _alert_service.cooldown.load([tuple(r) for r in rows]),
+)
+warm_state.register(
+    "seen_ids",
+    dump=lambda: [i for i, _ in seen_feedback_ids.items()],
+    load=lambda ids: seen_feedback_ids.load((i, True) for i in ids),
+)
+warm_state.register("fleet", dump=fleet_state.dump, load=fleet_state.load)
 
 MAX_RETRIES = 3
 RETRY_DELAY = 0.5
 
+# PostgREST error code for "function not found" — the migration hasn't run
+RPC_MISSING = "PGRST202"
+
+_rpc_enabled = USE_FEEDBACK_RPC
+
+
+def feedback_rpc_enabled() -> bool:
+    return _rpc_enabled
+
 
 def _retry(fn, *args, **kwargs):
     last_exc = None
@@ -28,42 +96,127 @@ def _retry(fn, *args, **kwargs):
 
 
 def process_feedback(feedback):
+    # Profiling off → one attribute check
+    if profiler.active and profiler.should_sample():
+        with profiler.profiled(current_trace_id()):
+            return _process_feedback(feedback)
+    return _process_feedback(feedback)
+
+
+def _process_feedback(feedback):
     driver_id = feedback.driver_id
 
+    with log_context(driver_id=driver_id):
+        try:
+            # 1. Analyze sentiment
+            result = _sentiment_service.analyze(feedback.text)
+            score = result["score"]
+            raw   = result["raw_score"]
+            label = result["label"]
+
+            logger.info("label=%s, score=%.3f/5 (raw=%+.3f)", label, score, raw, extra={"sample": True})
+
+            if _rpc_enabled and _ingest_via_rpc(feedback, result):
+                return
+
+            # 2. Save feedback row
+            @traced("feedback.insert")
+            def _insert():
+                return supabase.table("feedback").insert({
+                    "driver_id":            driver_id,
+                    "trip_id":              feedback.trip_id,
+                    "text":                 feedback.text,
+                    "sentiment":            score,
+                    "sentiment_label":      label,
+                    "entity_type":          feedback.entity_type,
+                    "external_feedback_id": feedback.external_feedback_id,
+                    "lexicon_version":      result["lexicon_version"],
+                }).execute().data
+
+            stored = _retry(_insert)
+            if feedback.external_feedback_id:
+                seen_feedback_ids.put(feedback.external_feedback_id, True)
+            if stored:
+                _log_feedback(stored[0])
+
+            # 3. Update EMA score
+            updated_score = _retry(
+                _driver_service.update_driver_score,
+                driver_id=driver_id,
+                new_score=score
+            )
+
+            drivers_snapshot.mark_dirty()
+            fleet_state.record(driver_id, updated_score, label)
+
+            logger.info("EMA → %.3f/5", updated_score, extra={"sample": True})
+
+            # 4. Alert if below threshold
+            _alert_service.check_and_alert(driver_id=driver_id, score=updated_score)
+            drivers_snapshot.mark_dirty()   # last_alert_at may have changed too
+
+        except Exception as e:
+            logger.error("Failed: %s", e, exc_info=True)
+
+
+def _ingest_via_rpc(feedback, result) -> bool:
+    """
+    Steps 2–4 in a single round trip. Returns False when the RPC isn't
+    deployed, so the caller carries on with the multi-call path.
+    """
+    global _rpc_enabled
     try:
-        # 1. Analyze sentiment
-        result = _sentiment_service.analyze(feedback.text)
-        score = result["score"]
-        raw   = result["raw_score"]
-        label = result["label"]
-
-        logger.info(f"[{driver_id}] label={label}, score={score:.3f}/5 (raw={raw:+.3f})")
-
-        # 2. Save feedback row
-        def _insert():
-            supabase.table("feedback").insert({
-                "driver_id":            driver_id,
-                "trip_id":              feedback.trip_id,
-                "text":                 feedback.text,
-                "sentiment":            score,
-                "sentiment_label":      label,
-                "entity_type":          feedback.entity_type,
-                "external_feedback_id": feedback.external_feedback_id,
-            }).execute()
-
-        _retry(_insert)
-
-        # 3. Update EMA score
-        updated_score = _retry(
-            _driver_service.update_driver_score,
-            driver_id=driver_id,
-            new_score=score
+        outcome = _retry(
+            _feedback_repo.ingest,
+            feedback, result,
+            alpha=ALPHA, alert_threshold=THRESHOLD_5, cooldown_hours=COOLDOWN_HOURS
         )
+    except APIError as e:
+        if e.code != RPC_MISSING:
+            raise
+        _rpc_enabled = False
+        logger.warning("ingest_feedback RPC not found, using the multi-call path: %s", e.message)
+        return False
+
+    if feedback.external_feedback_id:
+        seen_feedback_ids.put(feedback.external_feedback_id, True)
+
+    if outcome["duplicate"]:
+        logger.info("Duplicate %s ignored", feedback.external_feedback_id, extra={"sample": True})
+        return True
+
+    _log_feedback({
+        "id":                   outcome["feedback_id"],
+        "driver_id":            feedback.driver_id,
+        "trip_id":              feedback.trip_id,
+        "text":                 feedback.text,
+        "sentiment":            result["score"],
+        "sentiment_label":      result["label"],
+        "entity_type":          feedback.entity_type,
+        "external_feedback_id": feedback.external_feedback_id,
+        "lexicon_version":      result["lexicon_version"],
+        # Functions deployed before created_at was returned → worker clock
+        "created_at":           outcome.get("created_at") or datetime.utcnow().isoformat(),
+    })
 
-        logger.info(f"[{driver_id}] EMA → {updated_score:.3f}/5")
+    drivers_snapshot.mark_dirty()
+    fleet_state.record(feedback.driver_id, outcome["score"], result["label"])
+    logger.info("EMA → %.3f/5", outcome["score"], extra={"sample": True})
 
-        # 4. Alert if below threshold
-        _alert_service.check_and_alert(driver_id=driver_id, score=updated_score)
+    if outcome["alert_due"]:
+        _alert_service.send_claimed_alert(feedback.driver_id, outcome["score"], outcome["last_alert_at"])
+    return True
 
+
+def _log_feedback(row: dict):
+    # Right after the insert, so a later failing step can't leave the row out
+    # of the history. Best effort: a full disk or a bad FEEDBACK_LOG_DIR must
+    # never cost a score update or an alert — the row is read from Supabase
+    try:
+        feedback_log.append(row)
     except Exception as e:
-        logger.error(f"[{driver_id}] Failed: {e}", exc_info=True)
\ No newline at end of file
+        logger.error("Feedback log append failed for %s: %s", row.get("id"), e)
+        try:
+            feedback_log.mark_missing(row["id"])
+        except Exception as e:
+            logger.error("Feedback log floor not raised past %s: %s", row.get("id"), e)
@@ -0,0 +1,130 @@
+"""
+profiling.py
+─────────────
+On-demand statistical profiler for background feedback processing:
+  - Off by default; the hot-path cost is a single attribute check
+  - When on, 1 in N runs is sampled, optionally for a fixed time window
+  - A sampler thread reads the stacks of sampled threads every few ms
+  - Results are aggregated as folded stacks (flamegraph.pl / speedscope)
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from app.logger import logger
+
+DEFAULT_INTERVAL_MS = 5.0
+MAX_STACK_DEPTH     = 64
+
+
+def _fold(frame) -> str:
+    parts = []
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class SamplingProfiler:
+
+    def __init__(self):
+        self.active = False
+        self._lock = threading.Lock()
+        self._threads: dict = {}     # thread ident → trace_id being profiled
+        self._stacks: Counter = Counter()
+        self._sample_every = 1
+        self._seen = 0
+        self._profiled_runs = 0
+        self._samples = 0
+        self._interval = DEFAULT_INTERVAL_MS / 1000
+        self._started_at = None
+        self._deadline = None
+        self._sampler = None
+
+    def start(self, sample_every: int = 10, duration_seconds: float = None,
+              interval_ms: float = DEFAULT_INTERVAL_MS):
+        with self._lock:
+            if self.active:
+                raise RuntimeError("Profiling is already running")
+            self._stacks.clear()
+            self._sample_every = max(1, sample_every)
+            self._seen = 0
+            self._profiled_runs = 0
+            self._samples = 0
+            self._interval = max(0.001, interval_ms / 1000)
+            self._started_at = time.time()
+            self._deadline = time.monotonic() + duration_seconds if duration_seconds else None
+            self.active = True
+            self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+            self._sampler.start()
+        logger.warning("Profiling started: 1 in %s runs, window %ss", self._sample_every, duration_seconds)
+
+    def stop(self):
+        with self._lock:
+            if not self.active:
+                return
+            self.active = False
+            sampler, self._sampler = self._sampler, None
+        if sampler is not threading.current_thread():
+            sampler.join(timeout=1)
+        logger.warning("Profiling stopped: %s samples over %s runs", self._samples, self._profiled_runs)
+
+    def should_sample(self) -> bool:
+        if not self.active:
+            return False
+        with self._lock:
+            self._seen += 1
+            return self._seen % self._sample_every == 0
+
+    @contextmanager
+    def profiled(self, trace_id: str = None):
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = trace_id
+            self._profiled_runs += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads.pop(ident, None)
+
+    def report(self, limit: int = 500) -> dict:
+        with self._lock:
+            stacks = self._stacks.most_common(limit)
+            leaf_counts = Counter()
+            for stack, count in self._stacks.items():
+                leaf_counts[stack.rsplit(";", 1)[-1]] += count
+            return {
+                "active":        self.active,
+                "started_at":    self._started_at,
+                "sample_every":  self._sample_every,
+                "interval_ms":   self._interval * 1000,
+                "profiled_runs": self._profiled_runs,
+                "samples":       self._samples,
+                # "frame;frame;frame count" lines — feed to flamegraph.pl or speedscope
+                "folded":        "\n".join(f"{stack} {count}" for stack, count in stacks),
+                "top_frames":    [{"frame": f, "samples": n} for f, n in leaf_counts.most_common(20)],
+            }
+
+    def _sample_loop(self):
+        while self.active:
+            time.sleep(self._interval)
+            if self._deadline is not None and time.monotonic() >= self._deadline:
+                self.stop()
+                return
+            with self._lock:
+                idents = list(self._threads)
+            if not idents:
+                continue
+            frames = sys._current_frames()
+            folded = [_fold(frames[i]) for i in idents if i in frames]
+            with self._lock:
+                self._stacks.update(folded)
+                self._samples += len(folded)
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+
+# Path to a SQLite file shared by every worker process on the host.
+# Unset → a file in the system temp dir; ":memory:" → private to the process
+ALERT_COOLDOWN_DB = os.getenv("ALERT_COOLDOWN_DB") or os.path.join(
+    tempfile.gettempdir(), "driver-sentiment-cooldown.db"
+)
+
+
+def _to_epoch(value: datetime) -> float:
+    # Naive datetimes in this codebase are UTC (datetime.utcnow())
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _from_epoch(value: float) -> datetime:
+    return datetime.fromtimestamp(value, tz=timezone.utc).replace(tzinfo=None)
+
+
+class CooldownRepository:
+    """
+    Host-local alert cooldown state with an atomic check-and-set, so
+    several uvicorn workers never send the same alert twice.
+    SQLite's file lock does the cross-process coordination.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or ALERT_COOLDOWN_DB
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path,
+            timeout=10,
+            isolation_level=None,      # autocommit; each statement is atomic
+            check_same_thread=False,
+        )
+        with self._lock:
+            if self.path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS alert_cooldown ("
+                " driver_id TEXT PRIMARY KEY,"
+                " last_alert_at REAL"
+                ")"
+            )
+
+    def is_known(self, driver_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM alert_cooldown WHERE driver_id = ?", (driver_id,)
+            ).fetchone()
+        return row is not None
+
+    def seed(self, driver_id: str, last_alert_at: datetime | None):
+        # First writer wins; a concurrent seed from another worker is a no-op
+        value = _to_epoch(last_alert_at) if last_alert_at else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO alert_cooldown (driver_id, last_alert_at) VALUES (?, ?)",
+                (driver_id, value)
+            )
+
+    def get_last_alert(self, driver_id: str) -> datetime | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_alert_at FROM alert_cooldown WHERE driver_id = ?", (driver_id,)
+            ).fetchone()
+        return _from_epoch(row[0]) if row and row[0] is not None else None
+
+    def try_claim(self, driver_id: str, now: datetime, cooldown: timedelta) -> bool:
+        """
+        Atomically set last_alert_at = now if the cooldown has expired.
+        Returns True for exactly one caller per cooldown window, across
+        all processes sharing the file.
+        """
+        now_ts = _to_epoch(now)
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE alert_cooldown SET last_alert_at = ?"
+                " WHERE driver_id = ?"
+                " AND (last_alert_at IS NULL OR last_alert_at < ?)",
+                (now_ts, driver_id, now_ts - cooldown.total_seconds())
+            )
+        return cur.rowcount == 1
+
+    def release(self, driver_id: str, claimed_at: datetime, previous: datetime | None):
+        # Undo a try_claim() whose alert never went out. Only our own claim
+        # is rolled back — a later claim by another worker stays
+        with self._lock:
+            self._conn.execute(
+                "UPDATE alert_cooldown SET last_alert_at = ?"
+                " WHERE driver_id = ? AND last_alert_at = ?",
+                (_to_epoch(previous) if previous else None, driver_id, _to_epoch(claimed_at))
+            )
+
+    def record(self, driver_id: str, alerted_at: datetime):
+        # The alert was claimed elsewhere (the ingest_feedback RPC); keep the
+        # local state in step so the multi-call path honours the same window
+        value = _to_epoch(alerted_at)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO alert_cooldown (driver_id, last_alert_at) VALUES (?, ?)"
+                " ON CONFLICT(driver_id) DO UPDATE SET last_alert_at ="
+                " MAX(COALESCE(last_alert_at, 0), excluded.last_alert_at)",
+                (driver_id, value)
+            )
+
+    def dump(self) -> list:
+        # [(driver_id, last_alert_at epoch or None)] for the warm-state snapshot
+        with self._lock:
+            return self._conn.execute("SELECT driver_id, last_alert_at FROM alert_cooldown").fetchall()
+
+    def load(self, rows):
+        # Like seed(): rows already present (another worker, or a newer
+        # claim since startup) win
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO alert_cooldown (driver_id, last_alert_at) VALUES (?, ?)", rows
+            )
+            self._conn.execute("COMMIT")
@@ -1,9 +1,11 @@
 from app.config import supabase
+from app.tracing import traced
 from datetime import datetime
 
 
 class DriverRepository:
 
+    @traced("driver_sentiment.get_driver")
     def get_driver(self, driver_id: str):
         res = supabase.table("driver_sentiment") \
             .select("*") \
@@ -11,6 +13,23 @@ class DriverRepository:
             .execute()
         return res.data[0] if res.data else None
 
+    @traced("driver_sentiment.list_drivers")
+    def list_drivers(self):
+        res = supabase.table("driver_sentiment") \
+            .select("*") \
+            .order("score", desc=False) \
+            .execute()
+        return res.data
+
+    @traced("driver_sentiment.list_drivers_page")
+    def list_drivers_page(self, after_driver_id: str | None, limit: int):
+        query = supabase.table("driver_sentiment").select("*")
+        if after_driver_id is not None:
+            query = query.gt("driver_id", after_driver_id)
+        res = query.order("driver_id").limit(limit).execute()
+        return res.data
+
+    @traced("driver_sentiment.create_driver")
     def create_driver(self, driver_id: str, score: float):
         data = {
             "driver_id":    driver_id,
@@ -21,18 +40,27 @@ class DriverRepository:
         supabase.table("driver_sentiment").insert(data).execute()
         return data
 
-    def update_driver(self, driver_id: str, new_score: float, total_count: int):
+    @traced("driver_sentiment.update_driver")
+    def update_driver(self, driver_id: str, new_score: float, total_count: int,
+                      expected_count: int = None):
+        """
+        Returns the updated rows. With `expected_count`, the write only lands
+        if total_count is still that value — empty result means another
+        worker got there first.
+        """
         data = {
             "score":        new_score,
             "total_count":  total_count,
             "last_updated": datetime.utcnow().isoformat()
         }
-        supabase.table("driver_sentiment") \
+        query = supabase.table("driver_sentiment") \
             .update(data) \
-            .eq("driver_id", driver_id) \
-            .execute()
-        return data
+            .eq("driver_id", driver_id)
+        if expected_count is not None:
+            query = query.eq("total_count", expected_count)
+        return query.execute().data
 
+    @traced("driver_sentiment.update_alert_timestamp")
     def update_alert_timestamp(self, driver_id: str):
         supabase.table("driver_sentiment") \
             .update({"last_alert_at": datetime.utcnow().isoformat()}) \
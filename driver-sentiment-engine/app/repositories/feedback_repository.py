@@ -0,0 +1,62 @@
+from app.config import supabase
+from app.tracing import traced
+
+
+class FeedbackRepository:
+
+    @traced("feedback.find_by_external_id")
+    def exists(self, external_feedback_id: str) -> bool:
+        res = supabase.table("feedback") \
+            .select("id") \
+            .eq("external_feedback_id", external_feedback_id) \
+            .execute()
+        return bool(res.data)
+
+    @traced("feedback.list_after")
+    def list_after(self, last_id: int, created_before: str, limit: int):
+        # Keyset page in id order — stays cheap however far the export has got
+        res = supabase.table("feedback") \
+            .select("*") \
+            .gt("id", last_id) \
+            .lt("created_at", created_before) \
+            .order("id") \
+            .limit(limit) \
+            .execute()
+        return res.data
+
+    @traced("feedback.list_for_driver")
+    def list_for_driver(self, driver_id: str, before_id: int | None, label: str | None, limit: int):
+        # Newest first; served by feedback_driver_id_id_idx (sql/003)
+        query = supabase.table("feedback") \
+            .select("id,driver_id,trip_id,text,sentiment,sentiment_label,"
+                    "entity_type,external_feedback_id,lexicon_version,created_at") \
+            .eq("driver_id", driver_id)
+        if before_id is not None:
+            query = query.lt("id", before_id)
+        if label is not None:
+            query = query.eq("sentiment_label", label)
+        return query.order("id", desc=True).limit(limit).execute().data
+
+    @traced("rpc.ingest_feedback")
+    def ingest(self, feedback, sentiment: dict, alpha: float,
+               alert_threshold: float, cooldown_hours: int) -> dict:
+        """
+        Insert + EMA update + cooldown claim in one transaction
+        (sql/002_ingest_feedback.sql). Returns
+        {"duplicate": True} or {"duplicate": False, "feedback_id",
+        "created_at", "score", "total_count", "last_alert_at", "alert_due"}.
+        """
+        res = supabase.rpc("ingest_feedback", {
+            "p_driver_id":            feedback.driver_id,
+            "p_trip_id":              feedback.trip_id,
+            "p_text":                 feedback.text,
+            "p_sentiment":            sentiment["score"],
+            "p_sentiment_label":      sentiment["label"],
+            "p_entity_type":          feedback.entity_type,
+            "p_external_feedback_id": feedback.external_feedback_id,
+            "p_lexicon_version":      sentiment["lexicon_version"],
+            "p_alpha":                alpha,
+            "p_alert_threshold":      alert_threshold,
+            "p_cooldown_hours":       cooldown_hours,
+        }).execute()
+        return res.data
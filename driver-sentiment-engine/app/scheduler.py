@@ -0,0 +1,338 @@
+"""
+scheduler.py
+─────────────
+Multi-lane scheduler in front of process_feedback:
+  - Cheap intake classification against the negative vocabulary
+  - Safety-critical lanes dispatched first
+  - Starvation protection for lower lanes
+  - Per-lane queue-wait latency
+  - Driver-sharded workers: one owner thread per driver, updates in order
+"""
+
+import os
+import re
+import threading
+import time
+import zlib
+from collections import deque
+
+from app.utils.lexicon import lexicons, CompiledLexicon
+from app.logger import logger
+from app.tracing import trace
+
+# Highest priority first
+LANES = ("critical", "negative", "normal")
+
+# Lexicon weight at or below which a word is treated as safety-critical
+CRITICAL_WEIGHT = -3.0
+
+# Worker threads per process; each owns the drivers that hash to it
+SCHEDULER_SHARDS = int(os.getenv("SCHEDULER_SHARDS", 4))
+
+# A non-empty lane passed over this many times in a row gets the next slot
+STARVATION_LIMIT = int(os.getenv("SCHEDULER_STARVATION_LIMIT", 8))
+
+# How many recent queue-wait samples each lane keeps for percentiles
+WAIT_SAMPLES = 1024
+
+
+def _lane_for_weight(weight: float) -> str:
+    return "critical" if weight <= CRITICAL_WEIGHT else "negative"
+
+
+def _build_word_lanes(driver_lexicon: dict) -> dict:
+    return {
+        word: _lane_for_weight(weight)
+        for word, weight in driver_lexicon.items()
+        if weight < 0
+    }
+
+
+def _build_slang_lanes(slang_map: dict, word_lanes: dict) -> list:
+    # A slang pattern inherits the lane of the worst negative word it expands to
+    rules = []
+    for pattern, replacement in slang_map.items():
+        lanes = [word_lanes[w] for w in replacement.lower().split() if w in word_lanes]
+        if lanes:
+            lane = min(lanes, key=LANES.index)
+            rules.append((re.compile(pattern, re.IGNORECASE), lane))
+    return rules
+
+
+def _compile_priority(lexicon: CompiledLexicon) -> tuple:
+    word_lanes = _build_word_lanes(lexicon.driver_lexicon)
+    return word_lanes, _build_slang_lanes(lexicon.slang_map, word_lanes)
+
+
+# Rebuilt with every lexicon version, before it goes live
+lexicons.register_compiler("priority", _compile_priority)
+
+_TOKEN_RE = re.compile(r"[a-z]+")
+
+
+def classify_priority(text: str) -> str:
+    """
+    Pick a lane from raw feedback text without running the full NLP pipeline.
+    Only the negative entries of the live driver lexicon and slang map are
+    consulted.
+    """
+    if not text:
+        return "normal"
+
+    word_lanes, slang_lanes = lexicons.current.compiled["priority"]
+
+    best = len(LANES) - 1
+    for token in _TOKEN_RE.findall(text.lower()):
+        lane = word_lanes.get(token)
+        if lane is not None:
+            best = min(best, LANES.index(lane))
+            if best == 0:
+                return LANES[0]
+
+    for pattern, lane in slang_lanes:
+        if LANES.index(lane) < best and pattern.search(text):
+            best = LANES.index(lane)
+            if best == 0:
+                break
+
+    return LANES[best]
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def _wait_stats(waits) -> dict:
+    waits = sorted(waits)
+    return {
+        "wait_p50_ms": round(_percentile(waits, 50) * 1000, 2),
+        "wait_p95_ms": round(_percentile(waits, 95) * 1000, 2),
+        "wait_max_ms": round((waits[-1] if waits else 0.0) * 1000, 2),
+    }
+
+
+class _Entry:
+    __slots__ = ("lane", "item", "key", "enqueued_at", "done")
+
+    def __init__(self, lane: str, item, key):
+        self.lane        = lane
+        self.item        = item
+        self.key         = key
+        self.enqueued_at = time.monotonic()
+        self.done        = False
+
+
+class LaneQueue:
+    """
+    Blocking multi-lane queue. get() serves the highest non-empty lane,
+    except that a lane skipped STARVATION_LIMIT times in a row while it
+    had work waiting is served next.
+
+    Items put with the same `key` are always handed out in arrival order:
+    when an urgent item is picked, the key's older pending items come out
+    with it as one batch, ahead of it. Intended for a single consumer.
+    """
+
+    def __init__(self, lanes=LANES, starvation_limit: int = STARVATION_LIMIT):
+        self.lanes = tuple(lanes)
+        self.starvation_limit = starvation_limit
+        self._queues  = {lane: deque() for lane in self.lanes}
+        self._live    = {lane: 0 for lane in self.lanes}
+        self._skipped = {lane: 0 for lane in self.lanes}
+        self._dispatched = {lane: 0 for lane in self.lanes}
+        self._waits   = {lane: deque(maxlen=WAIT_SAMPLES) for lane in self.lanes}
+        self._pending: dict = {}   # key → deque of entries in arrival order
+        self._cond    = threading.Condition()
+        self._closed  = False
+
+    def put(self, lane: str, item, key=None) -> None:
+        if lane not in self._queues:
+            raise ValueError(f"Unknown lane: {lane}")
+        entry = _Entry(lane, item, key)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Queue is closed")
+            self._queues[lane].append(entry)
+            self._live[lane] += 1
+            if key is not None:
+                self._pending.setdefault(key, deque()).append(entry)
+            self._cond.notify()
+
+    def get(self, timeout: float = None) -> list:
+        """
+        Returns a batch of (lane, item, waited_seconds) tuples to process in
+        order, or an empty list once the queue is closed and drained (or on
+        timeout).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not any(self._live.values()):
+                if self._closed:
+                    return []
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+
+            lane  = self._pick()
+            entry = self._queues[lane].popleft()
+            batch = self._take_through(entry)
+
+            now = time.monotonic()
+            out = []
+            for e in batch:
+                e.done = True
+                waited = now - e.enqueued_at
+                self._live[e.lane] -= 1
+                self._dispatched[e.lane] += 1
+                self._waits[e.lane].append(waited)
+                out.append((e.lane, e.item, waited))
+            return out
+
+    def _take_through(self, entry: _Entry) -> list:
+        if entry.key is None:
+            return [entry]
+        pending = self._pending[entry.key]
+        batch = []
+        while True:
+            e = pending.popleft()
+            batch.append(e)
+            if e is entry:
+                break
+        if not pending:
+            del self._pending[entry.key]
+        return batch
+
+    def _pick(self) -> str:
+        # Caller holds the condition lock and guarantees some lane is live.
+        # Entries already handed out as part of another key's batch are
+        # dropped lazily when they reach the head of their lane.
+        for lane in self.lanes:
+            q = self._queues[lane]
+            while q and q[0].done:
+                q.popleft()
+
+        starved = next(
+            (lane for lane in self.lanes
+             if self._live[lane] and self._skipped[lane] >= self.starvation_limit),
+            None
+        )
+        chosen = starved or next(lane for lane in self.lanes if self._live[lane])
+
+        for lane in self.lanes:
+            if lane == chosen or not self._live[lane]:
+                self._skipped[lane] = 0
+            else:
+                self._skipped[lane] += 1
+        return chosen
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def depth(self) -> int:
+        with self._cond:
+            return sum(self._live.values())
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                lane: {
+                    "depth":      self._live[lane],
+                    "dispatched": self._dispatched[lane],
+                    **_wait_stats(self._waits[lane]),
+                }
+                for lane in self.lanes
+            }
+
+    def wait_samples(self, lane: str) -> list:
+        with self._cond:
+            return list(self._waits[lane])
+
+
+def shard_for(driver_id: str, shards: int) -> int:
+    # crc32 instead of hash(): stable across processes and restarts
+    return zlib.crc32(driver_id.encode("utf-8")) % shards
+
+
+class FeedbackScheduler:
+    """
+    Classifies feedback at intake and routes it by driver_id to a fixed set
+    of shards. Each shard is one worker thread with its own LaneQueue, so a
+    driver's updates are applied in order by a single owner while different
+    shards run in parallel.
+    """
+
+    def __init__(self, handler, shards: int = SCHEDULER_SHARDS):
+        self.handler = handler
+        self.shards  = shards
+        self.queues  = [LaneQueue() for _ in range(shards)]
+        self._processed = [0] * shards
+        self._threads: list = []
+
+    def start(self) -> None:
+        for i in range(self.shards):
+            t = threading.Thread(target=self._run, args=(i,), name=f"feedback-shard-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        # Shards drain whatever is already queued before exiting
+        for q in self.queues:
+            q.close()
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def submit(self, feedback, trace_id: str = None) -> str:
+        lane = classify_priority(feedback.text)
+        shard = shard_for(feedback.driver_id, self.shards)
+        self.queues[shard].put(lane, (feedback, trace_id), key=feedback.driver_id)
+        return lane
+
+    def stats(self) -> dict:
+        per_shard = [q.stats() for q in self.queues]
+        depths = [sum(s[lane]["depth"] for lane in LANES) for s in per_shard]
+        mean_depth = sum(depths) / len(depths) if depths else 0.0
+
+        lanes = {}
+        for lane in LANES:
+            waits = [w for q in self.queues for w in q.wait_samples(lane)]
+            lanes[lane] = {
+                "depth":      sum(s[lane]["depth"] for s in per_shard),
+                "dispatched": sum(s[lane]["dispatched"] for s in per_shard),
+                **_wait_stats(waits),
+            }
+
+        return {
+            "shards": [
+                {"shard": i, "depth": depths[i], "processed": self._processed[i]}
+                for i in range(self.shards)
+            ],
+            # max / mean queue depth — 1.0 is perfectly even, higher means a hot shard
+            "skew":  round(max(depths) / mean_depth, 2) if mean_depth else 1.0,
+            "lanes": lanes,
+        }
+
+    def _run(self, shard: int) -> None:
+        queue = self.queues[shard]
+        while True:
+            batch = queue.get()
+            if not batch:
+                return
+            for lane, (feedback, trace_id), waited in batch:
+                # Re-enter the submitting request's trace on the worker thread
+                with trace(trace_id):
+                    extra = {"driver_id": feedback.driver_id}
+                    if lane != "normal":
+                        logger.info("%s lane, waited %.0fms", lane, waited * 1000, extra={**extra, "sample": True})
+                    try:
+                        self.handler(feedback)
+                    except Exception as e:
+                        logger.error("Scheduler handler failed: %s", e, exc_info=True, extra=extra)
+                self._processed[shard] += 1
@@ -1,5 +1,6 @@
 import os
 from app.repositories.driver_repository import DriverRepository
+from app.repositories.cooldown_repository import CooldownRepository
 from app.config import COOLDOWN_HOURS, SLACK_WEBHOOK_URL
 from app.logger import logger
 from datetime import datetime, timedelta
@@ -10,10 +11,17 @@ THRESHOLD_5  = float(os.getenv("ALERT_THRESHOLD", 2.5))
 SLACK_WEBHOOK = os.getenv("SLACK_WEBHOOK_URL")
 
 
+def _parse_timestamp(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "").split("+")[0])
+
+
 class AlertService:
 
-    def __init__(self):
+    def __init__(self, cooldown: CooldownRepository = None):
         self.repo = DriverRepository()
+        self.cooldown = cooldown or CooldownRepository()
         self._driver_locks: dict = {}
         self._registry_lock = threading.Lock()
 
@@ -28,37 +36,74 @@ class AlertService:
             return
 
         with self._get_driver_lock(driver_id):
-            driver = self.repo.get_driver(driver_id)
-            if driver is None:
-                return
+            # Seed the host-local cooldown state from the DB once per driver
+            if not self.cooldown.is_known(driver_id):
+                driver = self.repo.get_driver(driver_id)
+                if driver is None:
+                    return
+                self.cooldown.seed(driver_id, _parse_timestamp(driver.get("last_alert_at")))
 
-            last_alert_at = driver.get("last_alert_at")
             now = datetime.utcnow()
+            cooldown = timedelta(hours=COOLDOWN_HOURS)
+            previous = self.cooldown.get_last_alert(driver_id)
 
-            if last_alert_at is None:
-                should_alert = True
-            else:
-                last_time = datetime.fromisoformat(
-                    last_alert_at.replace("Z", "").split("+")[0]
-                )
-                should_alert = (now - last_time) > timedelta(hours=COOLDOWN_HOURS)
-                if not should_alert:
-                    remaining = timedelta(hours=COOLDOWN_HOURS) - (now - last_time)
-                    logger.info(f"Alert cooldown for {driver_id}. Next in: {str(remaining).split('.')[0]}")
-
-            if should_alert:
+            # Atomic across worker processes — only one caller wins the window
+            if not self.cooldown.try_claim(driver_id, now, cooldown):
+                last_time = self.cooldown.get_last_alert(driver_id)
+                if last_time is not None:
+                    remaining = cooldown - (now - last_time)
+                    logger.info(
+                        "Alert cooldown for %s. Next in: %s", driver_id, str(remaining).split('.')[0],
+                        extra={"sample": True}
+                    )
+                return
+
+            try:
                 self.repo.update_alert_timestamp(driver_id)
                 self._send_alert(driver_id, score)
+            except Exception:
+                # Nothing went out — give the window back so the next feedback retries
+                self.cooldown.release(driver_id, now, previous)
+                raise
 
-    def _send_alert(self, driver_id: str, score: float):
+    def send_claimed_alert(self, driver_id: str, score: float, alerted_at: str | None):
+        # Cooldown already claimed in the same transaction as the score update
+        with self._get_driver_lock(driver_id):
+            self.cooldown.record(driver_id, _parse_timestamp(alerted_at) or datetime.utcnow())
+        self._send_alert(driver_id, score)
+
+    def alert_rule(self, driver_id: str, rule: str, reason: str, score: float) -> bool:
+        """
+        Alert from a fleet rule sweep. Each rule has its own cooldown key,
+        so it neither blocks nor is blocked by the threshold alert.
+        Returns True if the alert was sent.
+        """
+        key = f"{driver_id}#{rule}"
+        with self._get_driver_lock(driver_id):
+            self.cooldown.seed(key, None)
+            now = datetime.utcnow()
+            previous = self.cooldown.get_last_alert(key)
+            if not self.cooldown.try_claim(key, now, timedelta(hours=COOLDOWN_HOURS)):
+                return False
+        try:
+            self._send_alert(driver_id, score, reason=reason)
+        except Exception:
+            self.cooldown.release(key, now, previous)
+            raise
+        return True
+
+    def _send_alert(self, driver_id: str, score: float, reason: str = None):
         if not SLACK_WEBHOOK:
-            logger.warning(f"[ALERT] {driver_id} score {score:.2f}/5 below threshold {THRESHOLD_5}/5")
+            if reason:
+                logger.warning(f"[ALERT] {driver_id} {reason}")
+            else:
+                logger.warning(f"[ALERT] {driver_id} score {score:.2f}/5 below threshold {THRESHOLD_5}/5")
             return
 
         try:
             bar = "█" * int(score) + "░" * (5 - int(score))
             payload = {"text": (
-                f"🚨 *Driver Alert* — Score below threshold\n"
+                f"🚨 *Driver Alert* — {reason or 'Score below threshold'}\n"
                 f"*Driver:* `{driver_id}`\n"
                 f"*Score:* {score:.2f}/5  [{bar}]\n"
                 f"*Threshold:* {THRESHOLD_5}/5\n"
@@ -1,28 +1,55 @@
+import os
 from app.repositories.driver_repository import DriverRepository
+from app.utils.lru_cache import LRUCache
 
 ALPHA = 0.2  # EMA smoothing factor
 
+# Drivers whose last written score/count this process remembers; 0 disables
+DRIVER_CACHE_SIZE = int(os.getenv("DRIVER_CACHE_SIZE", 50000))
+
+
+class StaleDriverState(Exception):
+    """Another worker updated the driver between our read and our write."""
+
 
 class DriverService:
 
     def __init__(self):
         self.repo = DriverRepository()
+        # driver_id → (score, total_count) as this process last wrote it
+        self.cache = LRUCache(DRIVER_CACHE_SIZE)
 
     def update_driver_score(self, driver_id: str, new_score: float):
+        # Cached state skips the read; the conditional write catches the
+        # case where another worker has moved the row on since
+        cached = self.cache.get(driver_id)
+        if cached is not None:
+            try:
+                return self._apply(driver_id, new_score, *cached)
+            except StaleDriverState:
+                pass
+
         driver = self.repo.get_driver(driver_id)
 
         if driver is None:
             self.repo.create_driver(driver_id, new_score)
+            self.cache.put(driver_id, (new_score, 1))
             return new_score
 
-        old_score   = driver["score"]
-        total_count = driver["total_count"]
-        updated     = ALPHA * new_score + (1 - ALPHA) * old_score
+        # Raises StaleDriverState on a lost race; the caller's retry re-reads
+        return self._apply(driver_id, new_score, driver["score"], driver["total_count"])
+
+    def _apply(self, driver_id: str, new_score: float, old_score: float, total_count: int) -> float:
+        updated = ALPHA * new_score + (1 - ALPHA) * old_score
 
-        self.repo.update_driver(
+        if not self.repo.update_driver(
             driver_id=driver_id,
             new_score=updated,
-            total_count=total_count + 1
-        )
-
-        return updated
\ No newline at end of file
+            total_count=total_count + 1,
+            expected_count=total_count
+        ):
+            self.cache.pop(driver_id)
+            raise StaleDriverState(driver_id)
+
+        self.cache.put(driver_id, (updated, total_count + 1))
+        return updated
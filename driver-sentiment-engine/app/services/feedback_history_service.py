@@ -0,0 +1,40 @@
+"""
+feedback_history_service.py
+────────────────────────────
+One page of a driver's feedback, newest first:
+  - Served from the local feedback log while it covers the ids asked for
+  - Continued from Supabase below the log's floor (older than its retention,
+    or written before this host kept a log)
+The cursor is the last feedback id of the previous page, so local and
+Supabase pages join without gaps or repeats.
+"""
+
+from app.feedback_log import FeedbackLog, feedback_log
+from app.repositories.feedback_repository import FeedbackRepository
+
+
+class FeedbackHistoryService:
+
+    def __init__(self, log: FeedbackLog = feedback_log, repo: FeedbackRepository = None):
+        self.log = log
+        self.repo = repo or FeedbackRepository()
+
+    def list(self, driver_id: str, cursor: int = None, label: str = None, limit: int = 20) -> dict:
+        items = self.log.page(driver_id, before_id=cursor, label=label, limit=limit)
+        source = "local" if items else None
+
+        if len(items) < limit:
+            floor = self.log.floor() if self.log.enabled else None
+            before = cursor
+            if floor is not None:
+                before = floor if cursor is None else min(cursor, floor)
+            older = self.repo.list_for_driver(driver_id, before_id=before, label=label, limit=limit - len(items))
+            if older:
+                items += older
+                source = "mixed" if source else "supabase"
+
+        return {
+            "items":       items,
+            "next_cursor": items[-1]["id"] if len(items) == limit else None,
+            "source":      source,
+        }
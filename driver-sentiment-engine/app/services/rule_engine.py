@@ -0,0 +1,252 @@
+"""
+rule_engine.py
+───────────────
+Fleet-wide alert rules, evaluated for every driver in one vectorized sweep:
+  - Each processed feedback appends the driver's new score and label to
+    array columns — O(1), no DB reads
+  - Every RULE_SWEEP_INTERVAL seconds each enabled rule runs as a handful
+    of numpy operations over the whole fleet
+  - Drivers a rule fires for go through AlertService's cooldown and Slack path
+
+The inline EMA < ALERT_THRESHOLD check stays in AlertService.check_and_alert;
+rules here cover what needs history.
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.logger import logger
+
+RULE_SWEEP_INTERVAL = float(os.getenv("RULE_SWEEP_INTERVAL", 60))
+ALERT_RULES = [r.strip() for r in os.getenv("ALERT_RULES", "score_drop_24h,negative_streak").split(",") if r.strip()]
+
+# score_drop_24h: highest score in the window minus the current one
+SCORE_DROP_LIMIT  = float(os.getenv("RULE_SCORE_DROP", 1.0))
+SCORE_DROP_WINDOW = float(os.getenv("RULE_SCORE_DROP_HOURS", 24)) * 3600
+
+# negative_streak: this many negative labels among the last LABEL_WINDOW feedbacks
+NEGATIVE_MIN = int(os.getenv("RULE_NEGATIVE_MIN", 3))
+LABEL_WINDOW = 10
+
+# Score samples kept per driver; more updates than this within the drop
+# window shorten it to the newest HISTORY_SLOTS samples
+HISTORY_SLOTS = int(os.getenv("RULE_HISTORY_SLOTS", 64))
+
+LABEL_CODES = {"negative": -1, "neutral": 0, "positive": 1}
+
+
+class FleetState:
+    """
+    One row per driver, one array per field. Rings are written at
+    position count % width; unused slots stay empty (ts 0, NaN score,
+    neutral label) and never satisfy a rule.
+    """
+
+    def __init__(self, capacity: int = 1024, history_slots: int = HISTORY_SLOTS,
+                 label_window: int = LABEL_WINDOW):
+        self.lock = threading.Lock()
+        self.history_slots = history_slots
+        self.label_window = label_window
+        self.driver_ids: list = []
+        self._index: dict = {}
+        self._allocate(capacity)
+
+    def __len__(self) -> int:
+        return len(self.driver_ids)
+
+    def record(self, driver_id: str, score: float, label: str, at: float = None):
+        at = time.time() if at is None else at
+        with self.lock:
+            row = self._row(driver_id)
+            slot = self.history_count[row] % self.history_slots
+            self.history_ts[row, slot]    = at
+            self.history_score[row, slot] = score
+            self.history_count[row] += 1
+            self.labels[row, self.label_count[row] % self.label_window] = LABEL_CODES.get(label, 0)
+            self.label_count[row] += 1
+            self.score[row] = score
+
+    def columns(self) -> dict:
+        """Views over the live rows. Caller holds self.lock."""
+        n = len(self.driver_ids)
+        return {
+            "score":         self.score[:n],
+            "history_ts":    self.history_ts[:n],
+            "history_score": self.history_score[:n],
+            "labels":        self.labels[:n],
+        }
+
+    def dump(self) -> list:
+        # Rows for the warm-state snapshot, rings unrolled oldest first
+        with self.lock:
+            rows = []
+            for row, driver_id in enumerate(self.driver_ids):
+                h = self._unroll(self.history_count[row], self.history_slots)
+                l = self._unroll(self.label_count[row], self.label_window)
+                rows.append([
+                    driver_id,
+                    self.history_ts[row, h].tolist(),
+                    self.history_score[row, h].tolist(),
+                    self.labels[row, l].tolist(),
+                ])
+            return rows
+
+    def load(self, rows):
+        # Replays restored history only for drivers not seen since startup
+        for driver_id, ts, scores, codes in rows:
+            with self.lock:
+                if driver_id in self._index:
+                    continue
+                row = self._row(driver_id)
+                for at, score in zip(ts, scores):
+                    slot = self.history_count[row] % self.history_slots
+                    self.history_ts[row, slot], self.history_score[row, slot] = at, score
+                    self.history_count[row] += 1
+                for code in codes:
+                    self.labels[row, self.label_count[row] % self.label_window] = code
+                    self.label_count[row] += 1
+                if scores:
+                    self.score[row] = scores[-1]
+
+    # ─── internals ───────────────────────────────────────────────────────────
+    def _allocate(self, capacity: int):
+        self.score         = np.full(capacity, np.nan)
+        self.history_ts    = np.zeros((capacity, self.history_slots), dtype=np.uint32)
+        self.history_score = np.full((capacity, self.history_slots), np.nan, dtype=np.float32)
+        self.history_count = np.zeros(capacity, dtype=np.int64)
+        self.labels        = np.zeros((capacity, self.label_window), dtype=np.int8)
+        self.label_count   = np.zeros(capacity, dtype=np.int64)
+
+    def _row(self, driver_id: str) -> int:
+        row = self._index.get(driver_id)
+        if row is not None:
+            return row
+        row = len(self.driver_ids)
+        if row == len(self.score):
+            self._grow(2 * len(self.score))
+        self._index[driver_id] = row
+        self.driver_ids.append(driver_id)
+        return row
+
+    def _grow(self, capacity: int):
+        old = (self.score, self.history_ts, self.history_score, self.history_count, self.labels, self.label_count)
+        n = len(old[0])
+        self._allocate(capacity)
+        for new, previous in zip(
+            (self.score, self.history_ts, self.history_score, self.history_count, self.labels, self.label_count), old
+        ):
+            new[:n] = previous
+
+    def _unroll(self, count: int, width: int) -> list:
+        if count <= width:
+            return list(range(count))
+        start = count % width
+        return list(range(start, width)) + list(range(start))
+
+
+# ─── Rules ───────────────────────────────────────────────────────────────────
+class Rule:
+    """
+    evaluate(columns, now) → (fired mask, value per driver); both arrays
+    cover the whole fleet. message(value, score) → text for the alert.
+    """
+
+    def __init__(self, name: str, evaluate, message):
+        self.name = name
+        self.evaluate = evaluate
+        self.message = message
+
+
+def _score_drop(cols: dict, now: float):
+    recent = cols["history_ts"] >= now - SCORE_DROP_WINDOW
+    peak = np.where(recent, cols["history_score"], -np.inf).max(axis=1)
+    drop = peak - cols["score"]
+    return drop > SCORE_DROP_LIMIT, drop
+
+
+def _negative_streak(cols: dict, now: float):
+    negatives = (cols["labels"] == LABEL_CODES["negative"]).sum(axis=1)
+    return negatives >= NEGATIVE_MIN, negatives
+
+
+RULES = {
+    "score_drop_24h": Rule(
+        "score_drop_24h", _score_drop,
+        lambda drop, score: f"Score dropped {drop:.2f} in {SCORE_DROP_WINDOW / 3600:g}h (now {score:.2f}/5)",
+    ),
+    "negative_streak": Rule(
+        "negative_streak", _negative_streak,
+        lambda negatives, score: f"{negatives} negative feedbacks in the last {LABEL_WINDOW}",
+    ),
+}
+
+
+class RuleEngine:
+
+    def __init__(self, state: FleetState, alert_service, rules: list = None,
+                 interval: float = RULE_SWEEP_INTERVAL):
+        self.state = state
+        self.alerts = alert_service
+        self.rules = rules if rules is not None else [RULES[name] for name in ALERT_RULES]
+        self.interval = interval
+        self._last_sweep: dict = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def sweep(self, now: float = None) -> list:
+        """Evaluate every rule for every driver; returns the alerts actually sent."""
+        now = time.time() if now is None else now
+        started = time.perf_counter()
+
+        # Masks are computed under the lock (record() waits for at most one
+        # sweep); alerts go out after it is released
+        candidates = []
+        with self.state.lock:
+            cols = self.state.columns()
+            drivers = len(self.state)
+            for rule in self.rules:
+                fired, values = rule.evaluate(cols, now)
+                for row in np.flatnonzero(fired):
+                    candidates.append((self.state.driver_ids[row], rule, values[row], float(cols["score"][row])))
+        evaluated = time.perf_counter() - started
+
+        sent = []
+        for driver_id, rule, value, score in candidates:
+            if self.alerts.alert_rule(driver_id, rule.name, rule.message(value, score), score):
+                sent.append((driver_id, rule.name))
+
+        self._last_sweep = {
+            "at":          now,
+            "drivers":     drivers,
+            "rules":       [rule.name for rule in self.rules],
+            "eval_ms":     round(evaluated * 1000, 3),
+            "matched":     len(candidates),
+            "alerts_sent": len(sent),
+        }
+        return sent
+
+    def stats(self) -> dict:
+        return {"interval_seconds": self.interval, "last_sweep": self._last_sweep}
+
+    def start(self):
+        if self.interval <= 0 or not self.rules or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="rule-sweep", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error("Rule sweep failed: %s", e, exc_info=True)
@@ -5,12 +5,18 @@ VADER-based sentiment engine with:
   - Domain-specific driver lexicon
   - Text preprocessing (emojis, slang, unicode)
   - Score normalization: VADER -1..+1  →  0..5 (per requirements)
+  - Result cache for repeated texts, keyed by lexicon content digest
   - OOP interface for future ML model plug-in
 """
 
+import copy
+import os
+import threading
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 from abc import ABC, abstractmethod
 from app.utils.text_preprocessor import preprocess
+from app.utils.lexicon import lexicons, CompiledLexicon
+from app.utils.lru_cache import LRUCache
 
 
 # ─── Interface (OOP contract — swap in any ML model later) ──────────────────
@@ -24,35 +30,28 @@ class ISentimentProvider(ABC):
               "score":      float  # normalized 0–5
               "raw_score":  float  # VADER compound -1..+1
               "label":      str    # positive | neutral | negative
+              "lexicon_version": str  # vocabulary version that scored it
             }
         """
         pass
 
 
 # ─── Domain-specific lexicon entries for VADER ───────────────────────────────
-# Scale: -4 (very negative) to +4 (very positive)
-DRIVER_LEXICON = {
-    # Positive driver traits
-    "polite": 2.5, "courteous": 2.5, "careful": 1.8, "professional": 2.2,
-    "punctual": 2.0, "helpful": 2.0, "friendly": 2.5, "safe": 1.5,
-    "smooth": 1.5, "clean": 1.5, "comfortable": 1.8, "calm": 1.5,
-    "cooperative": 1.8, "attentive": 1.8, "kind": 2.2, "skilled": 2.0,
-    "expert": 2.0, "reliable": 2.0, "on-time": 2.0, "wellbehaved": 2.5,
-
-    # Negative driver traits
-    "rude": -2.8, "drunk": -3.5, "abusive": -3.5, "aggressive": -2.5,
-    "irresponsible": -3.0, "unsafe": -3.0, "careless": -2.5,
-    "unprofessional": -2.5, "late": -1.5, "speeding": -2.0,
-    "dirty": -1.8, "misbehaved": -2.8, "dishonest": -2.5,
-    "overcharged": -2.2, "yelling": -2.5, "smoking": -2.0,
-    "distracted": -2.2, "frisky": -1.5, "inappropriate": -2.5,
-    "harassment": -3.5, "threatening": -3.5,
-}
+# Live in versioned data files (app/data/lexicons/lexicon-<version>.json),
+# "driver_lexicon" section. Scale: -4 (very negative) to +4 (very positive)
 
 # VADER recommended threshold: ±0.05. Using ±0.08 to reduce noise.
 POS_THRESHOLD = 0.08
 NEG_THRESHOLD = -0.08
 
+# Short feedback repeats a lot ("great ride", "👍"); 0 disables the cache
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", 20000))
+
+# (lexicon digest, text) → result. A new lexicon simply misses, so a hot
+# swap never serves scores from the old vocabulary — even when a file was
+# edited without a version bump and a restarted worker loaded the new copy.
+analysis_cache = LRUCache(ANALYSIS_CACHE_SIZE)
+
 
 def _normalize_to_five(raw_score: float) -> float:
     """
@@ -68,24 +67,59 @@ def _normalize_to_five(raw_score: float) -> float:
     return round((raw_score + 1) / 2 * 5, 4)
 
 
+# ─── Shared VADER base ───────────────────────────────────────────────────────
+# Reading VADER's lexicon file is the slow part of startup; do it once per
+# process and derive one analyzer per lexicon version from it.
+_base_analyzer = None
+_base_lock = threading.Lock()
+
+
+def _get_base_analyzer() -> SentimentIntensityAnalyzer:
+    global _base_analyzer
+    if _base_analyzer is None:
+        with _base_lock:
+            if _base_analyzer is None:
+                _base_analyzer = SentimentIntensityAnalyzer()
+    return _base_analyzer
+
+
+def _compile_analyzer(lexicon: CompiledLexicon) -> SentimentIntensityAnalyzer:
+    # inject domain vocabulary into a copy of VADER's lexicon
+    base = _get_base_analyzer()
+    analyzer = copy.copy(base)
+    analyzer.lexicon = {**base.lexicon, **lexicon.driver_lexicon}
+    return analyzer
+
+
+# Built for every lexicon version before it goes live
+lexicons.register_compiler("vader", _compile_analyzer)
+
+
 # ─── Concrete VADER-backed implementation ────────────────────────────────────
 class SentimentService(ISentimentProvider):
 
-    def __init__(self):
-        self.analyzer = SentimentIntensityAnalyzer()
-        # inject domain vocabulary into VADER's live lexicon
-        self.analyzer.lexicon.update(DRIVER_LEXICON)
+    @property
+    def analyzer(self) -> SentimentIntensityAnalyzer:
+        return lexicons.current.compiled["vader"]
 
     def analyze(self, text: str) -> dict:
+        # One read of the live lexicon, so a concurrent swap can't mix versions
+        lex = lexicons.current
+
+        key = (lex.digest, text)
+        cached = analysis_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
         # Step 1: preprocess (emojis → words, slang, unicode cleanup)
-        clean_text = preprocess(text)
+        clean_text = preprocess(text, lex)
 
         # Fallback to original if preprocessing strips everything
         if not clean_text:
             clean_text = text
 
         # Step 2: VADER scoring
-        result = self.analyzer.polarity_scores(clean_text)
+        result = lex.compiled["vader"].polarity_scores(clean_text)
         raw_score = result["compound"]   # -1.0 to +1.0
 
         # Step 3: Label using VADER-recommended thresholds
@@ -99,8 +133,11 @@ class SentimentService(ISentimentProvider):
         # Step 4: Normalize to 0-5 scale (as per requirements: "2.5 out of 5")
         score_5 = _normalize_to_five(raw_score)
 
-        return {
+        result = {
             "score": score_5,          # 0–5, stored in DB and used for EMA
             "raw_score": raw_score,    # -1 to +1, for transparency
-            "label": label
-        }
\ No newline at end of file
+            "label": label,
+            "lexicon_version": lex.version
+        }
+        analysis_cache.put(key, result)
+        return dict(result)
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+snapshot_service.py
+────────────────────
+Pre-serialized snapshot of the GET /drivers payload:
+  - Rebuilt only when scores change, at most once per min interval
+  - Stored as JSON bytes plus pre-compressed gzip / zstd variants
+  - Versioned ETag so dashboard refreshes can be answered with 304
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+import zstandard
+
+from app.repositories.driver_repository import DriverRepository
+from app.logger import logger
+
+# Never rebuild more often than this, however many scores change
+SNAPSHOT_MIN_INTERVAL = float(os.getenv("DRIVERS_SNAPSHOT_MIN_INTERVAL", 2.0))
+
+# Rebuild at least this often even if this process saw no changes
+# (other worker processes update scores too)
+SNAPSHOT_MAX_AGE = float(os.getenv("DRIVERS_SNAPSHOT_MAX_AGE", 30.0))
+
+# Preferred first when the client accepts several
+ENCODINGS = ("zstd", "gzip")
+
+
+class DriversSnapshot:
+    __slots__ = ("version", "etag", "body", "encoded", "built_at")
+
+    def __init__(self, version: int, body: bytes, built_at: float):
+        self.version  = version
+        self.body     = body
+        self.built_at = built_at
+        # Content only — each worker counts versions on its own, and the same
+        # bytes must validate whichever worker the next request lands on
+        digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        self.etag = f'"{digest}"'
+        self.encoded = {
+            "gzip": gzip.compress(body, compresslevel=6),
+            "zstd": zstandard.ZstdCompressor(level=3).compress(body),
+        }
+
+    def encode_for(self, accept_encoding: str | None) -> tuple[str | None, bytes]:
+        """Returns (content_encoding, body) for the client's Accept-Encoding header."""
+        accepted = _parse_accept_encoding(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in accepted:
+                return encoding, self.encoded[encoding]
+        return None, self.body
+
+    def matches(self, if_none_match: str | None) -> bool:
+        if not if_none_match:
+            return False
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or any(t.removeprefix("W/") == self.etag for t in tags)
+
+
+def _parse_accept_encoding(header: str | None) -> set:
+    accepted = set()
+    for part in (header or "").split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        key, _, value = params.strip().partition("=")
+        if key.strip() == "q":
+            try:
+                if float(value) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name)
+    return accepted
+
+
+class DriverSnapshotService:
+
+    def __init__(self, min_interval: float = SNAPSHOT_MIN_INTERVAL, max_age: float = SNAPSHOT_MAX_AGE):
+        self.repo = DriverRepository()
+        self.min_interval = min_interval
+        self.max_age = max_age
+        self._snapshot: DriversSnapshot | None = None
+        self._dirty = True
+        self._build_lock = threading.Lock()
+
+    def mark_dirty(self):
+        # Called after every score / alert write; the rebuild itself is lazy
+        self._dirty = True
+
+    def get(self) -> DriversSnapshot:
+        snap = self._snapshot
+        if snap is not None and not self._is_due(snap, time.monotonic()):
+            return snap
+
+        with self._build_lock:
+            snap = self._snapshot
+            if snap is not None and not self._is_due(snap, time.monotonic()):
+                return snap
+            try:
+                self._snapshot = self._build(snap)
+            except Exception as e:
+                self._dirty = True
+                if snap is None:
+                    raise
+                # Serve the previous snapshot rather than failing the dashboard
+                logger.error("Drivers snapshot rebuild failed, serving v%s: %s", snap.version, e)
+                snap.built_at = time.monotonic()
+            return self._snapshot
+
+    def _is_due(self, snap: DriversSnapshot, now: float) -> bool:
+        age = now - snap.built_at
+        if age < self.min_interval:
+            return False
+        return self._dirty or age >= self.max_age
+
+    def _build(self, previous: DriversSnapshot | None) -> DriversSnapshot:
+        # Clear before reading so a write racing the query marks it dirty again
+        self._dirty = False
+        rows = self.repo.list_drivers()
+        body = json.dumps(
+            {"success": True, "data": rows},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+        if previous is not None and body == previous.body:
+            # Same content keeps the same version/ETag, so clients still get 304s
+            previous.built_at = time.monotonic()
+            return previous
+
+        version = previous.version + 1 if previous else 1
+        return DriversSnapshot(version, body, time.monotonic())
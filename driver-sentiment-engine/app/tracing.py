@@ -0,0 +1,62 @@
+"""
+tracing.py
+───────────
+Trace / correlation IDs that follow one feedback from POST /feedback,
+through the background queue, into every repository call:
+  - trace(trace_id) binds the ID for the current context (and its logs)
+  - traced(name) times a repository method and logs it against the trace
+"""
+
+import functools
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.logger import logger, log_context
+
+TRACE_HEADER = "X-Trace-Id"
+
+_trace_id: ContextVar[str | None] = ContextVar("trace_id", default=None)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def current_trace_id() -> str | None:
+    return _trace_id.get()
+
+
+@contextmanager
+def trace(trace_id: str | None):
+    """Bind trace_id for the block; log records inside it carry the ID."""
+    trace_id = trace_id or new_trace_id()
+    token = _trace_id.set(trace_id)
+    try:
+        with log_context(trace_id=trace_id):
+            yield trace_id
+    finally:
+        _trace_id.reset(token)
+
+
+def traced(name: str):
+    """Decorator for repository calls: logs duration and outcome per trace at DEBUG."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # Outside a trace, or with DEBUG off, this is a plain call
+            if _trace_id.get() is None or not logger.isEnabledFor(logging.DEBUG):
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            outcome = "ok"
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                outcome = "error"
+                raise
+            finally:
+                logger.debug("%s %s in %.1fms", name, outcome, (time.perf_counter() - start) * 1000)
+        return wrapper
+    return decorator
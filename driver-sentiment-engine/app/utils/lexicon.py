@@ -0,0 +1,221 @@
+"""
+lexicon.py
+───────────
+Versioned vocabularies (driver lexicon, emoji map, slang map) loaded from
+data files instead of code:
+  - Each file is compiled once into lookup structures
+  - Consumers register compile hooks so their derived structures are
+    built before a new version goes live
+  - Swapping versions is a single reference assignment — readers grab
+    `lexicons.current` once per call and never see a half-built lexicon
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+from app.logger import logger
+
+LEXICON_DIR = Path(os.getenv(
+    "LEXICON_DIR", Path(__file__).resolve().parent.parent / "data" / "lexicons"
+))
+
+# Pin a version (e.g. "1.0.0"); unset → newest file in LEXICON_DIR
+LEXICON_VERSION = os.getenv("LEXICON_VERSION")
+
+# Seconds between checks for new lexicon files; 0 disables the watcher
+LEXICON_WATCH_INTERVAL = float(os.getenv("LEXICON_WATCH_INTERVAL", 30))
+
+_FILE_RE = re.compile(r"^lexicon-(?P<version>[\w.\-]+)\.json$")
+
+
+class LexiconError(ValueError):
+    pass
+
+
+def _version_key(version: str) -> tuple:
+    # "1.10.0" sorts after "1.9.2"; non-numeric parts compare as text
+    return tuple((0, int(p), "") if p.isdigit() else (1, 0, p) for p in version.split("."))
+
+
+class CompiledLexicon:
+    """One immutable lexicon version plus everything compiled from it."""
+
+    def __init__(self, version: str, driver_lexicon: dict, emoji_map: dict, slang_map: dict):
+        self.version        = version
+        self.driver_lexicon = driver_lexicon
+        self.emoji_map      = emoji_map
+        self.slang_map      = slang_map
+        # Identifies the content, not just the declared version — results cached
+        # under one lexicon must never be reused under an edited copy of it
+        self.digest = hashlib.blake2b(
+            json.dumps([version, driver_lexicon, emoji_map, slang_map], ensure_ascii=False).encode("utf-8"),
+            digest_size=8,
+        ).hexdigest()
+
+        # Longest emoji first so multi-codepoint emoji (⚠️, ❤️) win over prefixes
+        emojis = sorted(emoji_map, key=len, reverse=True)
+        self.emoji_re = re.compile("|".join(re.escape(e) for e in emojis)) if emojis else None
+        # Slang rules stay ordered — later patterns may match earlier expansions
+        self.slang_rules = [
+            (re.compile(pattern, re.IGNORECASE), replacement)
+            for pattern, replacement in slang_map.items()
+        ]
+        # Filled by registered compile hooks (VADER lexicon, priority lanes, ...)
+        self.compiled: dict = {}
+
+    def replace_emojis(self, text: str) -> str:
+        if self.emoji_re is None:
+            return text
+        return self.emoji_re.sub(lambda m: f" {self.emoji_map[m.group(0)]} ", text)
+
+
+def load_lexicon_file(path: Path) -> CompiledLexicon:
+    try:
+        with open(path, encoding="utf-8") as f:
+            doc = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise LexiconError(f"Cannot read {path.name}: {e}") from e
+
+    version = doc.get("version")
+    if not isinstance(version, str) or not version:
+        raise LexiconError(f"{path.name}: missing version")
+
+    driver_lexicon = doc.get("driver_lexicon", {})
+    emoji_map      = doc.get("emoji_map", {})
+    slang_map      = doc.get("slang_map", {})
+
+    for word, weight in driver_lexicon.items():
+        if not isinstance(weight, (int, float)) or not -4.0 <= weight <= 4.0:
+            raise LexiconError(f"{path.name}: weight for {word!r} must be a number in -4..+4")
+    for mapping, name in ((emoji_map, "emoji_map"), (slang_map, "slang_map")):
+        if not all(isinstance(k, str) and isinstance(v, str) for k, v in mapping.items()):
+            raise LexiconError(f"{path.name}: {name} must map strings to strings")
+
+    try:
+        return CompiledLexicon(version, dict(driver_lexicon), dict(emoji_map), dict(slang_map))
+    except re.error as e:
+        raise LexiconError(f"{path.name}: invalid slang pattern: {e}") from e
+
+
+class LexiconRegistry:
+
+    def __init__(self, directory: Path = LEXICON_DIR, pinned_version: str = LEXICON_VERSION):
+        self.directory = Path(directory)
+        self.pinned_version = pinned_version
+        self._hooks: dict = {}
+        self._lock = threading.Lock()          # serializes reloads, never taken by readers
+        self._current: CompiledLexicon | None = None
+        self._dir_signature = None
+        self._watcher = None
+        self._stop_watching = threading.Event()
+
+    @property
+    def current(self) -> CompiledLexicon:
+        lex = self._current
+        if lex is None:
+            with self._lock:
+                if self._current is None:
+                    self._swap(self._compile(self._resolve(self.pinned_version)))
+                lex = self._current
+        return lex
+
+    def available_versions(self) -> list:
+        versions = []
+        for p in self.directory.glob("lexicon-*.json"):
+            m = _FILE_RE.match(p.name)
+            if m:
+                versions.append(m.group("version"))
+        return sorted(versions, key=_version_key)
+
+    def register_compiler(self, name: str, fn):
+        """
+        fn(lexicon) → derived structure, stored as lexicon.compiled[name].
+        Runs for every version before it goes live, and right away for the
+        current one.
+        """
+        with self._lock:
+            self._hooks[name] = fn
+            if self._current is not None:
+                self._current.compiled[name] = fn(self._current)
+
+    def reload(self, version: str = None) -> CompiledLexicon:
+        """
+        Load `version` (or the pinned / newest one), compile it fully, then
+        publish it. On any error the live lexicon stays untouched.
+
+        A version is immutable once loaded: a file edited in place under the
+        same version is ignored until it gets a new version number.
+        """
+        with self._lock:
+            lex = self._compile(self._resolve(version or self.pinned_version))
+            previous = self._current
+            if previous is not None and previous.version == lex.version and previous.digest != lex.digest:
+                logger.warning(
+                    "lexicon-%s.json changed without a version bump, keeping the loaded copy — "
+                    "save the edit under a new version", lex.version
+                )
+                return previous
+            self._swap(lex)
+        if previous is None or previous.version != lex.version:
+            logger.warning("Lexicon %s is live (was %s)", lex.version, previous.version if previous else None)
+        return lex
+
+    def start_watching(self, interval: float = LEXICON_WATCH_INTERVAL):
+        # Every worker process polls on its own, so a new file reaches all of them
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._dir_signature = self._signature()
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="lexicon-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=1)
+            self._watcher = None
+
+    # ─── internals ───────────────────────────────────────────────────────────
+    def _resolve(self, version: str | None) -> Path:
+        versions = self.available_versions()
+        if not versions:
+            raise LexiconError(f"No lexicon-*.json files in {self.directory}")
+        if version is None:
+            version = versions[-1]
+        elif version not in versions:
+            raise LexiconError(f"Lexicon version {version} not found")
+        return self.directory / f"lexicon-{version}.json"
+
+    def _compile(self, path: Path) -> CompiledLexicon:
+        lex = load_lexicon_file(path)
+        expected = _FILE_RE.match(path.name).group("version")
+        if lex.version != expected:
+            raise LexiconError(f"{path.name} declares version {lex.version}")
+        for name, fn in self._hooks.items():
+            lex.compiled[name] = fn(lex)
+        return lex
+
+    def _swap(self, lex: CompiledLexicon):
+        self._current = lex    # single reference assignment — atomic for readers
+
+    def _signature(self) -> tuple:
+        return tuple(sorted(
+            (p.name, p.stat().st_mtime_ns) for p in self.directory.glob("lexicon-*.json")
+        ))
+
+    def _watch(self, interval: float):
+        while not self._stop_watching.wait(interval):
+            try:
+                signature = self._signature()
+                if signature != self._dir_signature:
+                    self._dir_signature = signature
+                    self.reload()
+            except Exception as e:
+                logger.error("Lexicon reload failed, keeping %s: %s", self._current.version if self._current else None, e)
+
+
+lexicons = LexiconRegistry()
@@ -0,0 +1,58 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe bounded mapping; the least recently used entry is dropped
+    once `maxsize` is reached. items() / load() let the warm-state snapshot
+    carry the contents across a restart.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def items(self) -> list:
+        # Oldest first, so load() rebuilds the same recency order
+        with self._lock:
+            return list(self._data.items())
+
+    def load(self, items):
+        # Restored entries count as older than anything written since
+        # startup, and never overwrite it
+        with self._lock:
+            merged = OrderedDict((k, v) for k, v in items if k not in self._data)
+            merged.update(self._data)
+            while len(merged) > self.maxsize:
+                merged.popitem(last=False)
+            self._data = merged
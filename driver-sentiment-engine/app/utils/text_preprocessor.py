@@ -7,81 +7,13 @@ Handles: emojis → sentiment hints, slang normalization,
 import re
 import unicodedata
 
+from app.utils.lexicon import lexicons, CompiledLexicon
 
-# emoji to descriptive words
-EMOJI_MAP = {
-    "😊": "happy",
-    "😀": "great",
-    "😁": "excellent",
-    "🙂": "good",
-    "😍": "amazing",
-    "🥰": "loving",
-    "👍": "good",
-    "💯": "perfect",
-    "🌟": "excellent",
-    "⭐": "great",
-    "✨": "wonderful",
-    "🎉": "fantastic",
-    "👏": "well done",
-    "🚗": "",        # neutral — just a car
-    "😐": "okay",
-    "😑": "boring",
-    "🤷": "whatever",
-    "😤": "frustrated",
-    "😠": "angry",
-    "😡": "very angry",
-    "🤬": "extremely angry",
-    "😒": "unhappy",
-    "👎": "bad",
-    "😩": "terrible",
-    "😞": "disappointed",
-    "💔": "very bad",
-    "🤮": "disgusting",
-    "🚨": "emergency",
-    "⚠️": "warning",
-    "🔥": "amazing",   
-    "❤️": "love",
-    "💕": "wonderful",
-}
+# Emoji and slang vocabularies live in versioned data files (app/data/lexicons)
+# and are compiled once per version — see app/utils/lexicon.py
 
-#slang → expanded form 
-SLANG_MAP = {
-    r"\bgr8\b": "great",
-    r"\bgo0d\b": "good",
-    r"\blate af\b": "very late",
-    r"\bwtf\b": "what the hell",
-    r"\bomg\b": "oh my god",
-    r"\bngl\b": "not gonna lie",
-    r"\bfrfr\b": "for real",
-    r"\blit\b": "great",
-    r"\bslay\b": "excellent",
-    r"\bloaded\b": "drunk",
-    r"\bstoned\b": "drunk",
-    r"\bsmashed\b": "drunk",
-    r"\bwasted\b": "drunk",
-    r"\bdrunk af\b": "extremely drunk",
-    r"\bchill\b": "calm",
-    r"\bbro\b": "",       
-    r"\bbruh\b": "",
-    r"\bfam\b": "",
-    r"\bngl\b": "not gonna lie",
-    r"\btbh\b": "to be honest",
-    r"\bimho\b": "in my opinion",
-    r"\bish\b": "somewhat",
-    r"\bkinda\b": "somewhat",
-    r"\bsrry\b": "sorry",
-    r"\bthx\b": "thanks",
-    r"\bthnk\b": "thanks",
-    r"\bokay\b": "okay",
-    r"\bok\b": "okay",
-    r"\bnah\b": "no",
-    r"\byeah\b": "yes",
-    r"\byep\b": "yes",
-    r"\bnope\b": "no",
-}
 
-
-def preprocess(text: str) -> str:
+def preprocess(text: str, lexicon: CompiledLexicon = None) -> str:
     """
     Clean and normalize raw feedback text.
     Steps:
@@ -90,20 +22,24 @@ def preprocess(text: str) -> str:
       3. Expand slang
       4. Clean excessive punctuation / whitespace
       5. Lowercase (VADER is case-aware but normalizing helps consistency)
+
+    Pass `lexicon` to pin a version for the whole analysis; defaults to the
+    live one.
     """
     if not text or not text.strip():
         return ""
 
+    lex = lexicon or lexicons.current
+
     # 1. Replace emojis
-    for emoji_char, replacement in EMOJI_MAP.items():
-        text = text.replace(emoji_char, f" {replacement} ")
+    text = lex.replace_emojis(text)
 
     # 2. Unicode normalize 
     text = unicodedata.normalize("NFKC", text)
 
     # 3. Expand slang 
-    for pattern, replacement in SLANG_MAP.items():
-        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    for pattern, replacement in lex.slang_rules:
+        text = pattern.sub(replacement, text)
 
     # 4. punctuation repeats: "!!!!" → "!"
     text = re.sub(r"([!?.]){2,}", r"\1", text)
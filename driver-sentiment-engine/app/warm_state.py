@@ -0,0 +1,182 @@
+"""
+warm_state.py
+──────────────
+Warm restarts: the in-memory hot state (analysis cache, driver score and
+cooldown state, seen feedback IDs) is written to a local file every
+WARM_STATE_INTERVAL seconds and on shutdown, and read back at startup
+before /ready reports the worker ready.
+
+File layout (little-endian):
+  header   magic "DSEWARM\\0" | format version u16 | section count u16 |
+           created_at f64 | payload length u64 | crc32(payload) u32
+  payload  section table: name 16s | offset u64 | length u64  (per section)
+           section bodies: zstd-compressed JSON
+The file is read through mmap, so the checksum and decompression work on
+the page cache directly. A file that is missing, from another format
+version, older than WARM_STATE_MAX_AGE, truncated or failing its checksum
+is ignored — the service just starts cold.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+import zstandard
+
+from app.logger import logger
+
+# Unset → warm restarts disabled
+WARM_STATE_PATH     = os.getenv("WARM_STATE_PATH")
+WARM_STATE_INTERVAL = float(os.getenv("WARM_STATE_INTERVAL", 60))
+WARM_STATE_MAX_AGE  = float(os.getenv("WARM_STATE_MAX_AGE", 3600))
+
+MAGIC          = b"DSEWARM\x00"
+FORMAT_VERSION = 1
+
+_HEADER  = struct.Struct("<8sHHdQI")
+_SECTION = struct.Struct("<16sQQ")
+
+
+class WarmStateError(ValueError):
+    pass
+
+
+def encode(sections: dict, created_at: float = None) -> bytes:
+    """sections: name → JSON-serialisable object."""
+    compressor = zstandard.ZstdCompressor(level=3)
+    bodies = [
+        (name.encode("ascii"), compressor.compress(json.dumps(obj, separators=(",", ":")).encode("utf-8")))
+        for name, obj in sections.items()
+    ]
+    table, offset = [], _SECTION.size * len(bodies)
+    for name, body in bodies:
+        table.append(_SECTION.pack(name, offset, len(body)))
+        offset += len(body)
+    payload = b"".join(table) + b"".join(body for _, body in bodies)
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(bodies),
+        time.time() if created_at is None else created_at,
+        len(payload), zlib.crc32(payload),
+    )
+    return header + payload
+
+
+def decode(buf, max_age: float = None) -> dict:
+    """Inverse of encode(); raises WarmStateError for anything unusable."""
+    if len(buf) < _HEADER.size:
+        raise WarmStateError("file too short")
+    magic, version, count, created_at, length, crc = _HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise WarmStateError("not a warm-state file")
+    if version != FORMAT_VERSION:
+        raise WarmStateError(f"format version {version}, expected {FORMAT_VERSION}")
+    age = time.time() - created_at
+    if max_age is not None and age > max_age:
+        raise WarmStateError(f"snapshot is {age:.0f}s old")
+
+    payload = memoryview(buf)[_HEADER.size:]
+    try:
+        if len(payload) != length:
+            raise WarmStateError(f"payload is {len(payload)} bytes, header says {length}")
+        if zlib.crc32(payload) != crc:
+            raise WarmStateError("checksum mismatch")
+
+        decompressor = zstandard.ZstdDecompressor()
+        sections = {}
+        for i in range(count):
+            name, offset, size = _SECTION.unpack_from(payload, i * _SECTION.size)
+            body = decompressor.decompress(payload[offset:offset + size])
+            sections[name.rstrip(b"\x00").decode("ascii")] = json.loads(body)
+        return sections
+    finally:
+        payload.release()
+
+
+class WarmStateStore:
+
+    def __init__(self, path: str = WARM_STATE_PATH, max_age: float = WARM_STATE_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._providers: dict = {}     # name → (dump, load)
+        self._writer = None
+        self._stop = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def register(self, name: str, dump, load):
+        """
+        dump() → JSON-serialisable object, called on every write.
+        load(obj) restores it; it must not overwrite state that is newer.
+        """
+        if len(name.encode("ascii")) > 16:
+            raise ValueError(f"section name {name!r} longer than 16 bytes")
+        self._providers[name] = (dump, load)
+
+    def write(self) -> int:
+        if not self.enabled:
+            return 0
+        data = encode({name: dump() for name, (dump, _) in self._providers.items()})
+        # Per-process temp name: every worker may write the same path
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        return len(data)
+
+    def restore(self) -> dict:
+        """Load the snapshot into the registered providers. Returns entries per section."""
+        if not self.enabled:
+            return {}
+        try:
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                sections = decode(mm, max_age=self.max_age)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, zstandard.ZstdError) as e:
+            # ValueError covers WarmStateError, an empty file (mmap) and bad JSON
+            logger.warning("Ignoring warm-state snapshot %s: %s", self.path, e)
+            return {}
+
+        restored = {}
+        for name, obj in sections.items():
+            if name in self._providers:
+                self._providers[name][1](obj)
+                restored[name] = len(obj)
+        logger.warning("Warm state restored from %s: %s", self.path, restored)
+        return restored
+
+    def start(self, interval: float = WARM_STATE_INTERVAL):
+        if not self.enabled or interval <= 0 or self._writer is not None:
+            return
+        self._stop.clear()
+        self._writer = threading.Thread(target=self._write_loop, args=(interval,), name="warm-state-writer", daemon=True)
+        self._writer.start()
+
+    def stop(self):
+        # Final write on shutdown — the snapshot the next process will load
+        self._stop.set()
+        if self._writer is not None:
+            self._writer.join(timeout=1)
+            self._writer = None
+        self._safe_write()
+
+    def _write_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            self._safe_write()
+
+    def _safe_write(self):
+        try:
+            self.write()
+        except Exception as e:
+            logger.error("Warm-state write failed: %s", e)
+
+
+warm_state = WarmStateStore()
@@ -0,0 +1,420 @@
+"""
+fake_postgrest.py
+──────────────────
+Local stand-in for the Supabase PostgREST endpoints this service uses
+(`feedback` and `driver_sentiment`), so load tests never touch the real
+project.
+
+  - Enough of the PostgREST query syntax for supabase-py:
+    select, eq/neq/gt/gte/lt/lte/in filters, order, limit, offset
+  - Unique constraints on feedback.external_feedback_id and
+    driver_sentiment.driver_id (409, code 23505 — like Postgres)
+  - The ingest_feedback RPC (sql/002_ingest_feedback.sql), switchable off
+    to exercise the multi-call fallback
+  - Configurable latency, jitter and error injection
+  - Timestamps of every driver score write, for end-to-end timing
+
+Run:
+  python -m loadtest.fake_postgrest --port 54321 --latency-ms 15 --error-rate 0.01
+Then start the API against it:
+  SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_KEY=fake uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+# table → (primary key column, unique columns)
+TABLES = {
+    "feedback":         ("id",        ("external_feedback_id",)),
+    "driver_sentiment": ("driver_id", ()),
+}
+
+FUNCTIONS = ("ingest_feedback",)
+
+
+class FakeConfig:
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 rpc_enabled: bool = True):
+        self.latency_ms  = latency_ms
+        self.jitter_ms   = jitter_ms
+        self.error_rate  = error_rate
+        self.rpc_enabled = rpc_enabled
+
+    def as_dict(self) -> dict:
+        return {
+            "latency_ms":  self.latency_ms,
+            "jitter_ms":   self.jitter_ms,
+            "error_rate":  self.error_rate,
+            "rpc_enabled": self.rpc_enabled,
+        }
+
+
+class FakeStore:
+    """In-memory tables plus the bookkeeping the load generator reads back."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = {table: {} for table in TABLES}
+        self.unique = {table: {c: {} for c in TABLES[table][1]} for table in TABLES}
+        self._ids = itertools.count(1)
+        self.requests: dict = {}
+        self.injected_errors = 0
+        # driver_id → wall-clock times of each score write (create or update)
+        self.score_writes: dict = {}
+
+    def count_request(self, key: str):
+        with self.lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def record_score_write(self, driver_id: str):
+        with self.lock:
+            self.score_writes.setdefault(driver_id, []).append(time.time())
+
+    def ingest_feedback(self, params: dict) -> dict:
+        # Same steps and result shape as the SQL function; the store lock
+        # stands in for the transaction and the driver row lock
+        now = datetime.utcnow()
+        external_id = params.get("p_external_feedback_id")
+        with self.lock:
+            index = self.unique["feedback"]["external_feedback_id"]
+            if external_id is not None and external_id in index:
+                return {"duplicate": True}
+
+            feedback_id = next(self._ids)
+            self.rows["feedback"][feedback_id] = {
+                "id":                   feedback_id,
+                "driver_id":            params["p_driver_id"],
+                "trip_id":              params.get("p_trip_id"),
+                "text":                 params.get("p_text"),
+                "sentiment":            params["p_sentiment"],
+                "sentiment_label":      params.get("p_sentiment_label"),
+                "entity_type":          params.get("p_entity_type"),
+                "external_feedback_id": external_id,
+                "lexicon_version":      params.get("p_lexicon_version"),
+                "created_at":           now.isoformat(),
+            }
+            if external_id is not None:
+                index[external_id] = feedback_id
+
+            drivers = self.rows["driver_sentiment"]
+            driver = drivers.get(params["p_driver_id"])
+            if driver is None:
+                driver = drivers[params["p_driver_id"]] = {
+                    "driver_id":     params["p_driver_id"],
+                    "score":         params["p_sentiment"],
+                    "total_count":   1,
+                    "last_updated":  now.isoformat(),
+                    "last_alert_at": None,
+                }
+            else:
+                alpha = params["p_alpha"]
+                driver["score"]        = alpha * params["p_sentiment"] + (1 - alpha) * driver["score"]
+                driver["total_count"] += 1
+                driver["last_updated"] = now.isoformat()
+
+            last_alert = driver.get("last_alert_at")
+            cutoff = now - timedelta(hours=params["p_cooldown_hours"])
+            alert_due = driver["score"] < params["p_alert_threshold"] and (
+                last_alert is None or datetime.fromisoformat(last_alert) < cutoff
+            )
+            if alert_due:
+                driver["last_alert_at"] = now.isoformat()
+            result = {
+                "duplicate":     False,
+                "feedback_id":   feedback_id,
+                "created_at":    now.isoformat(),
+                "score":         driver["score"],
+                "total_count":   driver["total_count"],
+                "last_alert_at": driver.get("last_alert_at"),
+                "alert_due":     alert_due,
+            }
+        self.record_score_write(params["p_driver_id"])
+        return result
+
+    def reset(self):
+        with self.lock:
+            self.rows = {table: {} for table in TABLES}
+            self.unique = {table: {c: {} for c in TABLES[table][1]} for table in TABLES}
+            self.requests = {}
+            self.injected_errors = 0
+            self.score_writes = {}
+
+
+# ─── PostgREST query parsing ─────────────────────────────────────────────────
+_RESERVED = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _coerce(value: str):
+    if value == "null":
+        return None
+    if value in ("true", "false"):
+        return value == "true"
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _compare(op: str, actual, expected) -> bool:
+    if op == "is":
+        return actual is None if expected is None else actual == expected
+    if actual is None:
+        return False
+    if op == "in":
+        return actual in expected
+    # Compare as the row's own type; ISO timestamps compare fine as strings
+    if isinstance(actual, (int, float)) and isinstance(expected, str):
+        return False
+    if isinstance(actual, str) and not isinstance(expected, str):
+        expected = str(expected)
+    return {
+        "eq":  lambda: actual == expected,
+        "neq": lambda: actual != expected,
+        "gt":  lambda: actual > expected,
+        "gte": lambda: actual >= expected,
+        "lt":  lambda: actual < expected,
+        "lte": lambda: actual <= expected,
+    }[op]()
+
+
+def _parse_filters(params) -> list:
+    filters = []
+    for column, raw in params.multi_items():
+        if column in _RESERVED:
+            continue
+        negate = raw.startswith("not.")
+        if negate:
+            raw = raw[4:]
+        op, _, value = raw.partition(".")
+        if op == "in":
+            expected = [_coerce(v.strip().strip('"')) for v in value.strip("()").split(",") if v]
+        else:
+            expected = _coerce(value)
+        filters.append((column, op, expected, negate))
+    return filters
+
+
+def _matches(row: dict, filters: list) -> bool:
+    for column, op, expected, negate in filters:
+        if _compare(op, row.get(column), expected) == negate:
+            return False
+    return True
+
+
+def _candidates(store: "FakeStore", table: str, filters: list) -> list:
+    # Equality on the primary key or a unique column is a dict lookup, not a
+    # scan — keeps the fake cheap enough that it never becomes the bottleneck.
+    # Caller holds store.lock.
+    pk, unique = TABLES[table]
+    rows = store.rows[table]
+    for column, op, expected, negate in filters:
+        if op != "eq" or negate:
+            continue
+        if column == pk:
+            key = expected if expected in rows else str(expected)
+            return [rows[key]] if key in rows else []
+        if column in unique:
+            index = store.unique[table][column]
+            key = expected if expected in index else str(expected)
+            return [rows[index[key]]] if key in index else []
+    return list(rows.values())
+
+
+def _apply_order(rows: list, order: str | None) -> list:
+    if not order:
+        return rows
+    # Apply right-to-left so the first key wins (stable sort)
+    for term in reversed(order.split(",")):
+        parts = term.split(".")
+        column = parts[0]
+        desc = "desc" in parts[1:]
+        nulls_first = "nullsfirst" in parts[1:] or ("nullslast" not in parts[1:] and desc)
+        present = [r for r in rows if r.get(column) is not None]
+        missing = [r for r in rows if r.get(column) is None]
+        present.sort(key=lambda r: r[column], reverse=desc)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+def _project(rows: list, select: str | None) -> list:
+    if not select or select.strip() == "*":
+        return rows
+    columns = [c.strip() for c in select.split(",")]
+    return [{c: r.get(c) for c in columns} for r in rows]
+
+
+def _error(status: int, message: str, code: str) -> JSONResponse:
+    return JSONResponse(status_code=status, content={
+        "message": message, "code": code, "hint": None, "details": None
+    })
+
+
+def _wants_body(request: Request) -> bool:
+    return "return=representation" in request.headers.get("prefer", "")
+
+
+# ─── App ─────────────────────────────────────────────────────────────────────
+def create_app(config: FakeConfig = None, store: FakeStore = None) -> FastAPI:
+    config = config or FakeConfig()
+    store  = store or FakeStore()
+    app = FastAPI(title="Fake PostgREST")
+    app.state.config = config
+    app.state.store  = store
+
+    @app.middleware("http")
+    async def inject_latency_and_errors(request: Request, call_next):
+        if request.url.path.startswith("/rest/v1/"):
+            delay = config.latency_ms + random.uniform(0, config.jitter_ms)
+            if delay > 0:
+                await asyncio.sleep(delay / 1000)
+            if config.error_rate and random.random() < config.error_rate:
+                with store.lock:
+                    store.injected_errors += 1
+                return _error(500, "injected failure", "XX000")
+        return await call_next(request)
+
+    @app.get("/rest/v1/{table}")
+    def select_rows(table: str, request: Request):
+        if table not in TABLES:
+            return _error(404, f'relation "public.{table}" does not exist', "42P01")
+        store.count_request(f"GET {table}")
+        params = request.query_params
+        filters = _parse_filters(params)
+        with store.lock:
+            candidates = _candidates(store, table, filters)
+            rows = [dict(r) for r in candidates if _matches(r, filters)]
+        rows = _apply_order(rows, params.get("order"))
+        offset = int(params.get("offset", 0))
+        limit = params.get("limit")
+        rows = rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+        return _project(rows, params.get("select"))
+
+    @app.post("/rest/v1/{table}")
+    async def insert_rows(table: str, request: Request):
+        if table not in TABLES:
+            return _error(404, f'relation "public.{table}" does not exist', "42P01")
+        store.count_request(f"POST {table}")
+        payload = await request.json()
+        rows = payload if isinstance(payload, list) else [payload]
+        pk, unique = TABLES[table]
+
+        inserted = []
+        with store.lock:
+            existing = store.rows[table]
+            indexes  = store.unique[table]
+            for row in rows:
+                row = dict(row)
+                if table == "feedback":
+                    row.setdefault("id", next(store._ids))
+                    row.setdefault("created_at", datetime.utcnow().isoformat())
+                if row.get(pk) in existing:
+                    return _error(409, f'duplicate key value violates unique constraint "{table}_pkey"', "23505")
+                for column in unique:
+                    if row.get(column) is not None and row[column] in indexes[column]:
+                        return _error(409, f'duplicate key value violates unique constraint "{table}_{column}_key"', "23505")
+                existing[row[pk]] = row
+                for column in unique:
+                    if row.get(column) is not None:
+                        indexes[column][row[column]] = row[pk]
+                inserted.append(dict(row))
+
+        if table == "driver_sentiment":
+            for row in inserted:
+                store.record_score_write(row["driver_id"])
+
+        if _wants_body(request):
+            return JSONResponse(status_code=201, content=inserted)
+        return Response(status_code=201)
+
+    @app.patch("/rest/v1/{table}")
+    async def update_rows(table: str, request: Request):
+        if table not in TABLES:
+            return _error(404, f'relation "public.{table}" does not exist', "42P01")
+        store.count_request(f"PATCH {table}")
+        changes = await request.json()
+        filters = _parse_filters(request.query_params)
+
+        updated = []
+        with store.lock:
+            for row in _candidates(store, table, filters):
+                if _matches(row, filters):
+                    row.update(changes)
+                    updated.append(dict(row))
+
+        if table == "driver_sentiment" and "score" in changes:
+            for row in updated:
+                store.record_score_write(row["driver_id"])
+
+        if _wants_body(request):
+            return updated
+        return Response(status_code=204)
+
+    @app.post("/rest/v1/rpc/{function}")
+    async def call_function(function: str, request: Request):
+        if function not in FUNCTIONS or not config.rpc_enabled:
+            # What PostgREST answers before the migration has been run
+            return _error(404, f"Could not find the function public.{function} in the schema cache", "PGRST202")
+        store.count_request(f"POST rpc/{function}")
+        params = await request.json()
+        return store.ingest_feedback(params)
+
+    # ─── Control endpoints (not part of PostgREST) ───────────────────────────
+    @app.get("/_fake/stats")
+    def stats():
+        with store.lock:
+            return {
+                "config":          config.as_dict(),
+                "rows":            {t: len(r) for t, r in store.rows.items()},
+                "requests":        dict(store.requests),
+                "injected_errors": store.injected_errors,
+                "score_writes":    {d: list(ts) for d, ts in store.score_writes.items()},
+            }
+
+    @app.post("/_fake/config")
+    async def update_config(request: Request):
+        changes = await request.json()
+        for key in ("latency_ms", "jitter_ms", "error_rate"):
+            if key in changes:
+                setattr(config, key, float(changes[key]))
+        if "rpc_enabled" in changes:
+            config.rpc_enabled = bool(changes["rpc_enabled"])
+        return config.as_dict()
+
+    @app.post("/_fake/reset")
+    def reset():
+        store.reset()
+        return {"success": True}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake of the Supabase PostgREST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="fixed delay added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra uniform random delay, 0..N ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failed with HTTP 500")
+    parser.add_argument("--no-rpc", action="store_true", help="answer ingest_feedback like an unmigrated database")
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_app(FakeConfig(args.latency_ms, args.jitter_ms, args.error_rate, rpc_enabled=not args.no_rpc))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
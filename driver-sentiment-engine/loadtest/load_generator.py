@@ -0,0 +1,238 @@
+"""
+load_generator.py
+──────────────────
+Open-loop load generator for the API. Drives POST /feedback,
+GET /driver/{id} and GET /drivers at fixed target rates and reports:
+  - Sustained throughput and status codes per endpoint
+  - Response latency percentiles (p50 / p95 / p99 / max)
+  - End-to-end time from POST /feedback to the driver's EMA write,
+    read back from the fake PostgREST (see fake_postgrest.py)
+
+Run (API and fake already started):
+  python -m loadtest.load_generator --target http://127.0.0.1:8000 \\
+      --fake http://127.0.0.1:54321 --feedback-rps 200 --duration 60
+"""
+
+import argparse
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+FEEDBACK_TEXTS = [
+    "great ride, very polite driver",
+    "smooth and punctual, thanks",
+    "the ride was completed",
+    "okay ride",
+    "driver was late and a bit rude",
+    "car was dirty, driver kept speeding",
+    "driver was drunk",
+    "felt unsafe, he was threatening me",
+    "👍 gr8 trip",
+    "😡 worst ride ever",
+]
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def _summary(values_s: list) -> dict:
+    values = sorted(v * 1000 for v in values_s)
+    return {
+        "p50_ms": round(_percentile(values, 50), 1),
+        "p95_ms": round(_percentile(values, 95), 1),
+        "p99_ms": round(_percentile(values, 99), 1),
+        "max_ms": round(values[-1], 1) if values else 0.0,
+    }
+
+
+class EndpointStats:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: list = []
+        self.statuses: dict = {}
+        self.sent = 0
+
+    def record(self, status, latency: float):
+        with self.lock:
+            self.latencies.append(latency)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def report(self, elapsed: float) -> dict:
+        with self.lock:
+            ok = sum(n for s, n in self.statuses.items() if isinstance(s, int) and s < 400)
+            return {
+                "sent":           self.sent,
+                "ok":             ok,
+                "throughput_rps": round(ok / elapsed, 1) if elapsed else 0.0,
+                "statuses":       {str(s): n for s, n in sorted(self.statuses.items(), key=str)},
+                **_summary(self.latencies),
+            }
+
+
+class LoadGenerator:
+
+    def __init__(self, target: str, drivers: int = 500, concurrency: int = 64, timeout: float = 10.0):
+        self.target = target.rstrip("/")
+        self.driver_ids = [f"load_drv_{i:05d}" for i in range(drivers)]
+        self.client = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+        self.pool = ThreadPoolExecutor(max_workers=concurrency)
+        self.stats = {
+            "POST /feedback":     EndpointStats(),
+            "GET /driver/{id}":   EndpointStats(),
+            "GET /drivers":       EndpointStats(),
+        }
+        # driver_id → wall-clock submit times of accepted feedback, in order
+        self.submissions: dict = {}
+        self._sub_lock = threading.Lock()
+
+    # ─── Requests ────────────────────────────────────────────────────────────
+    def _timed(self, name: str, fn):
+        start = time.perf_counter()
+        try:
+            status = fn().status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        self.stats[name].record(status, time.perf_counter() - start)
+        return status
+
+    def _post_feedback(self):
+        driver_id = random.choice(self.driver_ids)
+        body = {
+            "driver_id":            driver_id,
+            "trip_id":              f"trip_{uuid.uuid4().hex[:12]}",
+            "text":                 random.choice(FEEDBACK_TEXTS),
+            "entity_type":          "driver",
+            "external_feedback_id": uuid.uuid4().hex,
+        }
+        submitted_at = time.time()
+        status = self._timed("POST /feedback", lambda: self.client.post(f"{self.target}/feedback", json=body))
+        if status == 202:
+            with self._sub_lock:
+                self.submissions.setdefault(driver_id, []).append(submitted_at)
+
+    def _get_driver(self):
+        driver_id = random.choice(self.driver_ids)
+        self._timed("GET /driver/{id}", lambda: self.client.get(f"{self.target}/driver/{driver_id}"))
+
+    def _get_drivers(self):
+        self._timed("GET /drivers", lambda: self.client.get(
+            f"{self.target}/drivers", headers={"Accept-Encoding": "zstd, gzip"}
+        ))
+
+    # ─── Open-loop pacing ────────────────────────────────────────────────────
+    def _pace(self, name: str, fn, rps: float, duration: float):
+        # Requests are scheduled on a fixed timetable regardless of how long
+        # earlier ones take, so a slow server shows up as latency, not as a
+        # silently lower offered rate.
+        if rps <= 0:
+            return
+        interval = 1.0 / rps
+        start = time.perf_counter()
+        n = 0
+        while True:
+            due = start + n * interval
+            if due - start >= duration:
+                return
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.pool.submit(fn)
+            self.stats[name].sent += 1
+            n += 1
+
+    def run(self, duration: float, feedback_rps: float, driver_rps: float, drivers_rps: float) -> float:
+        plan = [
+            ("POST /feedback",   self._post_feedback, feedback_rps),
+            ("GET /driver/{id}", self._get_driver,    driver_rps),
+            ("GET /drivers",     self._get_drivers,   drivers_rps),
+        ]
+        threads = [
+            threading.Thread(target=self._pace, args=(name, fn, rps, duration), daemon=True)
+            for name, fn, rps in plan
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.pool.shutdown(wait=True)
+        return time.perf_counter() - start
+
+    # ─── End-to-end (submission → EMA write) ─────────────────────────────────
+    def end_to_end(self, fake_url: str, drain_timeout: float) -> dict:
+        """
+        Pairs the k-th accepted feedback for a driver with the k-th score
+        write the fake saw for that driver. Driver shards apply a driver's
+        updates in order, so the pairing holds.
+        """
+        expected = sum(len(v) for v in self.submissions.values())
+        deadline = time.time() + drain_timeout
+        writes = {}
+        while True:
+            writes = httpx.get(f"{fake_url.rstrip('/')}/_fake/stats", timeout=10).json()["score_writes"]
+            done = sum(min(len(writes.get(d, [])), len(s)) for d, s in self.submissions.items())
+            if done >= expected or time.time() >= deadline:
+                break
+            time.sleep(0.5)
+
+        latencies = []
+        for driver_id, submitted in self.submissions.items():
+            for sent_at, written_at in zip(submitted, writes.get(driver_id, [])):
+                latencies.append(max(0.0, written_at - sent_at))
+
+        return {
+            "submitted": expected,
+            "applied":   len(latencies),
+            "lost":      expected - len(latencies),
+            **_summary(latencies),
+        }
+
+
+def _print_report(elapsed: float, report: dict):
+    print("=" * 72)
+    print(f"LOAD TEST — {elapsed:.1f}s")
+    print("=" * 72)
+    for name, r in report.items():
+        print(f"\n── {name} {'─' * (60 - len(name))}")
+        for key, value in r.items():
+            print(f"  {key:<16} {value}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load generator for the sentiment API")
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="API base URL")
+    parser.add_argument("--fake", default=None, help="fake PostgREST base URL, enables end-to-end timing")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--feedback-rps", type=float, default=100.0)
+    parser.add_argument("--driver-rps", type=float, default=50.0)
+    parser.add_argument("--drivers-rps", type=float, default=2.0)
+    parser.add_argument("--drivers", type=int, default=500, help="distinct driver_ids to spread feedback over")
+    parser.add_argument("--concurrency", type=int, default=64, help="max in-flight requests")
+    parser.add_argument("--drain-timeout", type=float, default=60.0,
+                        help="how long to wait for queued feedback to be applied")
+    args = parser.parse_args()
+
+    gen = LoadGenerator(args.target, drivers=args.drivers, concurrency=args.concurrency)
+    elapsed = gen.run(args.duration, args.feedback_rps, args.driver_rps, args.drivers_rps)
+
+    report = {name: s.report(elapsed) for name, s in gen.stats.items()}
+    if args.fake:
+        report["Submission → EMA write"] = gen.end_to_end(args.fake, args.drain_timeout)
+    _print_report(elapsed, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+-- Records which lexicon version scored each feedback row, so a rescoring
+-- job can select only rows scored by an older vocabulary.
+alter table feedback add column if not exists lexicon_version text;
+
+create index if not exists feedback_lexicon_version_idx on feedback (lexicon_version);
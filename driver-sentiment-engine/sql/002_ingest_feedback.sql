@@ -0,0 +1,78 @@
+-- One round trip per feedback: insert the row (idempotent on
+-- external_feedback_id), apply the EMA and claim the alert cooldown in a
+-- single transaction. Called as supabase.rpc("ingest_feedback", ...) when
+-- USE_FEEDBACK_RPC=true; the multi-call path in processing_tasks.py stays
+-- as the fallback.
+--
+-- The driver row is locked by the upsert until the function returns, so
+-- concurrent feedback for one driver can't lose EMA updates and only one
+-- caller per cooldown window gets alert_due = true.
+
+-- ON CONFLICT needs a unique index on the idempotency key (NULLs never conflict)
+create unique index if not exists feedback_external_feedback_id_key
+    on feedback (external_feedback_id);
+
+create or replace function ingest_feedback(
+    p_driver_id            text,
+    p_trip_id              text,
+    p_text                 text,
+    p_sentiment            double precision,
+    p_sentiment_label      text,
+    p_entity_type          text,
+    p_external_feedback_id text,
+    p_lexicon_version      text,
+    p_alpha                double precision,
+    p_alert_threshold      double precision,
+    p_cooldown_hours       integer
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_now         timestamp := timezone('utc', now());
+    v_feedback_id feedback.id%type;
+    v_created_at  feedback.created_at%type;
+    v_driver      driver_sentiment%rowtype;
+    v_alert_due   boolean := false;
+begin
+    insert into feedback (
+        driver_id, trip_id, text, sentiment, sentiment_label,
+        entity_type, external_feedback_id, lexicon_version
+    ) values (
+        p_driver_id, p_trip_id, p_text, p_sentiment, p_sentiment_label,
+        p_entity_type, p_external_feedback_id, p_lexicon_version
+    )
+    on conflict (external_feedback_id) do nothing
+    returning id, created_at into v_feedback_id, v_created_at;
+
+    if v_feedback_id is null then
+        return jsonb_build_object('duplicate', true);
+    end if;
+
+    -- First feedback seeds the score; later ones blend in with the EMA
+    insert into driver_sentiment as d (driver_id, score, total_count, last_updated)
+    values (p_driver_id, p_sentiment, 1, v_now)
+    on conflict (driver_id) do update
+        set score        = p_alpha * excluded.score + (1 - p_alpha) * d.score,
+            total_count  = d.total_count + 1,
+            last_updated = excluded.last_updated
+    returning * into v_driver;
+
+    if v_driver.score < p_alert_threshold
+       and (v_driver.last_alert_at is null
+            or v_driver.last_alert_at < v_now - make_interval(hours => p_cooldown_hours)) then
+        update driver_sentiment set last_alert_at = v_now where driver_id = p_driver_id;
+        v_driver.last_alert_at := v_now;
+        v_alert_due := true;
+    end if;
+
+    return jsonb_build_object(
+        'duplicate',     false,
+        'feedback_id',   v_feedback_id,
+        'created_at',    v_created_at,
+        'score',         v_driver.score,
+        'total_count',   v_driver.total_count,
+        'last_alert_at', v_driver.last_alert_at,
+        'alert_due',     v_alert_due
+    );
+end;
+$$;
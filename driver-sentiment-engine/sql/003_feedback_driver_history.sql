@@ -0,0 +1,4 @@
+-- GET /driver/{driver_id}/feedback reads a driver's newest feedback first,
+-- paging on id. Rows older than the API's local store come from here; this
+-- index turns that into a range scan instead of a filter over the table.
+create index if not exists feedback_driver_id_id_idx on feedback (driver_id, id desc);
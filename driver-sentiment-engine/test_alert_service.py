@@ -7,12 +7,18 @@ Run: python test_alert_service.py
 NOTE: These tests mock the DB to avoid needing a live Supabase connection.
 """
 
+import os
+import tempfile
 import threading
 import time
 from unittest.mock import MagicMock, patch
 from datetime import datetime, timedelta
 
+# Fresh cooldown state per run, not the host-wide default file
+os.environ["ALERT_COOLDOWN_DB"] = ":memory:"
+
 from app.services.alert_service import AlertService, THRESHOLD_5, COOLDOWN_HOURS
+from app.repositories.cooldown_repository import CooldownRepository
 
 PASS = "✅ PASS"
 FAIL = "❌ FAIL"
@@ -132,13 +138,77 @@ print(f"  {PASS if ok else FAIL}  10 simultaneous bad feedbacks → {len(concurr
 print(f"         Calls: {concurrent_calls}\n")
 
 
+# ─── Test 6: Two workers sharing a cooldown file → only 1 alert ───────────
+header("MULTI-WORKER: shared cooldown file → only 1 alert fires")
+
+# Each AlertService gets its own SQLite connection, like separate uvicorn
+# worker processes on the same host. Neither sees the other's thread locks.
+db_path = os.path.join(tempfile.mkdtemp(), "cooldown.db")
+workers = [AlertService(cooldown=CooldownRepository(db_path)) for _ in range(2)]
+worker_calls = []
+
+for w in workers:
+    w.repo = MagicMock()
+    w.repo.get_driver.return_value = {"last_alert_at": None}   # both read "never alerted"
+    w._send_alert = lambda d, s: worker_calls.append(d)
+
+threads = [
+    threading.Thread(target=workers[i % 2].check_and_alert, args=("drv_006", 0.8))
+    for i in range(10)
+]
+for t in threads: t.start()
+for t in threads: t.join()
+
+ok = len(worker_calls) == 1
+print(f"  {PASS if ok else FAIL}  2 workers × 5 bad feedbacks → {len(worker_calls)} alert(s) (expected 1)")
+print(f"         Calls: {worker_calls}\n")
+
+
+# ─── Test 7: Failed timestamp write releases the claim ────────────────────
+header("FAILURE: DB write fails → next feedback retries")
+
+service7 = AlertService()
+calls7 = []
+service7.repo = MagicMock()
+service7.repo.get_driver.return_value = {"last_alert_at": None}
+service7.repo.update_alert_timestamp.side_effect = [ConnectionError("supabase timeout"), None]
+
+with patch.object(service7, '_send_alert', side_effect=lambda d, s: calls7.append(d)):
+    try:
+        service7.check_and_alert("drv_007", score=1.0)
+        raised = False
+    except ConnectionError:
+        raised = True
+    released = service7.cooldown.get_last_alert("drv_007") is None
+    service7.check_and_alert("drv_007", score=1.0)
+
+ok = raised and released and calls7 == ["drv_007"]
+print(f"  {PASS if ok else FAIL}  Write failed → claim released ({released}); retry → {len(calls7)} alert(s) (expected 1)")
+
+
+# ─── Test 8: Default cooldown store is a host-wide file ────────────────────
+header("DEFAULT: cooldown store shared across processes")
+
+import importlib
+import app.repositories.cooldown_repository as cooldown_module
+os.environ.pop("ALERT_COOLDOWN_DB")
+default_path = importlib.reload(cooldown_module).ALERT_COOLDOWN_DB
+os.environ["ALERT_COOLDOWN_DB"] = ":memory:"
+importlib.reload(cooldown_module)
+ok8 = default_path.startswith(tempfile.gettempdir()) and default_path.endswith(".db")
+print(f"  {PASS if ok8 else FAIL}  ALERT_COOLDOWN_DB unset → {default_path}\n")
+
+
 # ─── Summary ────────────────────────────────────────────────────────────────
 all_tests = [
     len(send_called) == 0,
     len(calls2) == 1,
     len(calls3) == 0,
     len(calls4) == 1,
-    len(concurrent_calls) == 1
+    len(concurrent_calls) == 1,
+    len(worker_calls) == 1,
+    raised and released and calls7 == ["drv_007"],
+    ok8,
 ]
 passed = sum(all_tests)
 print("=" * 60)
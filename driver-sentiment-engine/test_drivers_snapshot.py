@@ -0,0 +1,117 @@
+"""
+test_drivers_snapshot.py
+─────────────────────────
+Tests the pre-serialized GET /drivers snapshot: lazy rebuilds, ETag
+versioning, and pre-compressed variants.
+Run: python test_drivers_snapshot.py
+
+Uses a mock repository — no live DB required.
+"""
+
+import gzip
+import json
+import time
+from unittest.mock import MagicMock
+
+import zstandard
+
+from app.services.snapshot_service import DriverSnapshotService
+
+PASS = "✅ PASS"
+FAIL = "❌ FAIL"
+
+print("=" * 60)
+print("DRIVERS SNAPSHOT TESTS")
+print("=" * 60 + "\n")
+
+results = []
+
+rows = [
+    {"driver_id": "drv_1", "score": 1.9, "total_count": 4},
+    {"driver_id": "drv_2", "score": 4.2, "total_count": 9},
+]
+
+svc = DriverSnapshotService(min_interval=0.05, max_age=60)
+svc.repo = MagicMock()
+svc.repo.list_drivers.side_effect = lambda: [dict(r) for r in rows]
+
+
+# ─── Test 1: First call builds, repeat calls are served from memory ────────
+snap = svc.get()
+for _ in range(10):
+    svc.get()
+ok = svc.repo.list_drivers.call_count == 1 and json.loads(snap.body) == {"success": True, "data": rows}
+print(f"  {PASS if ok else FAIL}  11 reads → {svc.repo.list_drivers.call_count} DB query (expected 1)")
+results.append(ok)
+
+
+# ─── Test 2: Compressed variants decode to the same payload ────────────────
+gz = gzip.decompress(snap.encoded["gzip"])
+zs = zstandard.ZstdDecompressor().decompress(snap.encoded["zstd"])
+ok = gz == snap.body and zs == snap.body
+print(f"  {PASS if ok else FAIL}  gzip ({len(snap.encoded['gzip'])}B) and zstd ({len(snap.encoded['zstd'])}B) round-trip to {len(snap.body)}B JSON")
+results.append(ok)
+
+
+# ─── Test 3: Accept-Encoding negotiation ───────────────────────────────────
+checks = [
+    ("gzip, deflate, br, zstd", "zstd"),
+    ("gzip",                    "gzip"),
+    ("zstd;q=0, gzip",          "gzip"),
+    (None,                      None),
+]
+ok = all(snap.encode_for(header)[0] == expected for header, expected in checks)
+print(f"  {PASS if ok else FAIL}  Accept-Encoding picks zstd > gzip > identity, honours q=0")
+results.append(ok)
+
+
+# ─── Test 4: If-None-Match ─────────────────────────────────────────────────
+ok = snap.matches(snap.etag) and snap.matches(f'W/{snap.etag}, "other"') and not snap.matches('"0-abc"')
+print(f"  {PASS if ok else FAIL}  ETag {snap.etag} matches strong/weak forms, rejects others")
+results.append(ok)
+
+
+# ─── Test 5: Dirty mark respects the min rebuild interval ──────────────────
+rows[0]["score"] = 1.7
+svc.mark_dirty()
+too_soon = svc.get()
+time.sleep(0.06)
+rebuilt = svc.get()
+ok = too_soon is snap and rebuilt.version == snap.version + 1 and rebuilt.etag != snap.etag
+print(f"  {PASS if ok else FAIL}  Rebuild waits for min interval, then bumps v{snap.version} → v{rebuilt.version}")
+results.append(ok)
+
+
+# ─── Test 6: Unchanged content keeps the same ETag ─────────────────────────
+svc.mark_dirty()
+time.sleep(0.06)
+same = svc.get()
+ok = same.etag == rebuilt.etag and svc.repo.list_drivers.call_count == 3
+print(f"  {PASS if ok else FAIL}  Rebuild with identical rows keeps ETag {same.etag}")
+results.append(ok)
+
+
+# ─── Test 7: DB failure keeps serving the previous snapshot ────────────────
+svc.repo.list_drivers.side_effect = RuntimeError("supabase down")
+svc.mark_dirty()
+time.sleep(0.06)
+fallback = svc.get()
+ok = fallback is same
+print(f"  {PASS if ok else FAIL}  Rebuild failure → previous snapshot v{fallback.version} still served")
+results.append(ok)
+
+
+# ─── Test 8: Workers at different versions agree on the ETag ───────────────
+other = DriverSnapshotService(min_interval=0.05, max_age=60)
+other.repo = MagicMock()
+other.repo.list_drivers.return_value = rows
+fresh = other.get()
+ok = fresh.version != same.version and fresh.etag == same.etag
+print(f"  {PASS if ok else FAIL}  v{fresh.version} on a fresh worker and v{same.version} here share ETag {fresh.etag}\n")
+results.append(ok)
+
+
+passed = sum(results)
+print("=" * 60)
+print(f"Results: {passed}/{len(results)} passed")
+print("=" * 60)
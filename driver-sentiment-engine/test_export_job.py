@@ -0,0 +1,171 @@
+"""
+test_export_job.py
+───────────────────
+Tests the incremental Parquet / Iceberg export: watermarks, partitioning,
+the safety lag, daily driver snapshots and compaction.
+Run: python test_export_job.py
+
+Reads from the load-test fake PostgREST and writes to a temporary
+directory. The Iceberg test needs a SQL catalog and the partition
+transforms (pip install "pyiceberg[sql-sqlite,pyiceberg-core]") and is
+skipped without them.
+"""
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pyarrow.dataset as ds
+import uvicorn
+
+from loadtest.fake_postgrest import create_app
+
+with socket.socket() as s:
+    s.bind(("127.0.0.1", 0))
+    PORT = s.getsockname()[1]
+os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{PORT}"
+os.environ["SUPABASE_KEY"] = "fake"
+
+from app.export_job import FeedbackExportJob, ParquetSink, IcebergSink
+
+PASS = "✅ PASS"
+FAIL = "❌ FAIL"
+SKIP = "⏭  SKIP"
+
+def header(title):
+    print(f"\n── {title} {'─' * (55 - len(title))}\n")
+
+fake = create_app()
+store = fake.state.store
+server = uvicorn.Server(uvicorn.Config(fake, host="127.0.0.1", port=PORT, log_level="warning"))
+threading.Thread(target=server.run, daemon=True).start()
+while not server.started:
+    time.sleep(0.05)
+
+print("=" * 60)
+print("EXPORT JOB TESTS")
+print("=" * 60)
+
+results = []
+tmp = Path(tempfile.mkdtemp())
+next_id = 1
+
+def add_feedback(n, created_at, entity_type="driver"):
+    global next_id
+    for _ in range(n):
+        store.rows["feedback"][next_id] = {
+            "id": next_id, "driver_id": f"drv_{next_id % 5}", "trip_id": "t", "text": "ok",
+            "sentiment": 3.0, "sentiment_label": "neutral", "entity_type": entity_type,
+            "external_feedback_id": None, "lexicon_version": "1.0.0",
+            "created_at": created_at.isoformat(),
+        }
+        next_id += 1
+
+def read_feedback(root):
+    return ds.dataset(root / "feedback", format="parquet", partitioning="hive").to_table()
+
+now = datetime.utcnow()
+yesterday = now - timedelta(days=1)
+add_feedback(7, yesterday, "driver")
+add_feedback(4, yesterday, "trip")
+add_feedback(5, now - timedelta(hours=1), "driver")
+
+
+# ─── Test 1: First run exports everything, partitioned ─────────────────────
+header("PARQUET: incremental export")
+
+parquet_root = tmp / "parquet"
+job = FeedbackExportJob(ParquetSink(parquet_root), batch_size=3, safety_lag=60)
+exported = job.export_feedback()
+table = read_feedback(parquet_root)
+partitions = sorted(str(p.relative_to(parquet_root / "feedback")) for p in (parquet_root / "feedback").glob("*/*"))
+ok = exported == 16 and table.num_rows == 16 and len(partitions) == 3 \
+    and sorted(set(table.column("entity_type").to_pylist())) == ["driver", "trip"]
+print(f"  {PASS if ok else FAIL}  {exported} rows in pages of 3 → partitions {partitions}")
+results.append(ok)
+
+
+# ─── Test 2: Second run picks up only new rows ─────────────────────────────
+add_feedback(2, now - timedelta(minutes=30), "app")
+exported = job.export_feedback()
+ids = read_feedback(parquet_root).column("id").to_pylist()
+ok = exported == 2 and len(ids) == len(set(ids)) == 18 and job.sink.feedback_watermark() == 18
+print(f"  {PASS if ok else FAIL}  Rerun exported {exported}, {len(ids)} unique ids, watermark {job.sink.feedback_watermark()}")
+results.append(ok)
+
+
+# ─── Test 3: Rows inside the safety lag wait for a later run ───────────────
+add_feedback(3, datetime.utcnow(), "driver")
+held_back = job.export_feedback()
+job.safety_lag = 0
+caught_up = job.export_feedback()
+ok = held_back == 0 and caught_up == 3
+print(f"  {PASS if ok else FAIL}  Fresh rows: {held_back} exported inside the lag, {caught_up} once it passed")
+results.append(ok)
+
+
+# ─── Test 4: One driver snapshot per day ───────────────────────────────────
+header("SNAPSHOT: driver_sentiment once a day")
+
+for i in range(7):
+    store.rows["driver_sentiment"][f"drv_{i}"] = {
+        "driver_id": f"drv_{i}", "score": 2.0 + i / 10, "total_count": i + 1,
+        "last_updated": now.isoformat(), "last_alert_at": None,
+    }
+first = job.snapshot_drivers(day=date(2026, 1, 2))
+again = job.snapshot_drivers(day=date(2026, 1, 2))
+snap = ds.dataset(parquet_root / "driver_sentiment", format="parquet", partitioning="hive").to_table()
+ok = first == 7 and again is None and snap.num_rows == 7
+print(f"  {PASS if ok else FAIL}  First call wrote {first} drivers (pages of 3), second skipped → {again}")
+results.append(ok)
+
+
+# ─── Test 5: Compaction merges small files without losing rows ─────────────
+header("COMPACTION: small files → one per partition")
+
+before = len(list((parquet_root / "feedback").rglob("*.parquet")))
+compacted = job.sink.compact(min_files=2)
+after = len(list((parquet_root / "feedback").rglob("*.parquet")))
+ids = read_feedback(parquet_root).column("id").to_pylist()
+ok = compacted >= 1 and after < before and sorted(ids) == list(range(1, 22))
+print(f"  {PASS if ok else FAIL}  {compacted} partitions compacted: {before} → {after} files, all 21 rows intact")
+results.append(ok)
+
+
+# ─── Test 6: Same export into Iceberg ──────────────────────────────────────
+header("ICEBERG: table sink")
+
+try:
+    import pyiceberg_core          # day() partition transform on write
+    from pyiceberg.catalog.sql import SqlCatalog
+    catalog = SqlCatalog("test", uri=f"sqlite:///{tmp}/catalog.db", warehouse=f"file://{tmp}/warehouse")
+except ImportError:
+    catalog = None
+
+if catalog is None:
+    print(f"  {SKIP}  Install pyiceberg[sql-sqlite,pyiceberg-core] to run the Iceberg sink test\n")
+else:
+    iceberg_job = FeedbackExportJob(IcebergSink(catalog), batch_size=4, safety_lag=0)
+    exported = iceberg_job.export_feedback()
+    rerun = iceberg_job.export_feedback()
+    files_before = iceberg_job.sink.feedback.inspect.files().num_rows
+    iceberg_job.sink.compact(min_files=2)
+    files_after = iceberg_job.sink.feedback.inspect.files().num_rows
+    rows = iceberg_job.sink.feedback.scan().to_arrow()
+    ok = exported == 21 and rerun == 0 and iceberg_job.sink.feedback_watermark() == 21 \
+        and rows.num_rows == 21 and files_after < files_before
+    print(f"  {PASS if ok else FAIL}  {exported} rows appended, rerun {rerun}, files {files_before} → {files_after} after compaction\n")
+    results.append(ok)
+
+server.should_exit = True
+shutil.rmtree(tmp)
+
+passed = sum(results)
+print("=" * 60)
+print(f"Results: {passed}/{len(results)} passed")
+print("=" * 60)
@@ -0,0 +1,107 @@
+"""
+test_fake_postgrest.py
+───────────────────────
+Checks that the load-test PostgREST stand-in behaves like Supabase for the
+calls this service makes: the real DriverRepository / DriverService run
+against it unchanged.
+Run: python test_fake_postgrest.py
+"""
+
+import os
+import socket
+import threading
+import time
+
+import uvicorn
+
+from loadtest.fake_postgrest import create_app, FakeConfig
+
+# Point the app's Supabase client at the fake before anything imports it
+with socket.socket() as s:
+    s.bind(("127.0.0.1", 0))
+    PORT = s.getsockname()[1]
+os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{PORT}"
+os.environ["SUPABASE_KEY"] = "fake"
+
+from postgrest.exceptions import APIError
+from app.config import supabase
+from app.repositories.driver_repository import DriverRepository
+from app.services.driver_service import DriverService, ALPHA
+
+PASS = "✅ PASS"
+FAIL = "❌ FAIL"
+
+config = FakeConfig()
+fake = create_app(config)
+server = uvicorn.Server(uvicorn.Config(fake, host="127.0.0.1", port=PORT, log_level="warning"))
+threading.Thread(target=server.run, daemon=True).start()
+while not server.started:
+    time.sleep(0.05)
+
+print("=" * 60)
+print("FAKE POSTGREST TESTS")
+print("=" * 60 + "\n")
+
+results = []
+
+
+# ─── Test 1: Repository create / get / update round-trip ───────────────────
+repo = DriverRepository()
+repo.create_driver("drv_fake_1", 4.0)
+svc = DriverService()
+updated = svc.update_driver_score("drv_fake_1", new_score=1.0)
+row = repo.get_driver("drv_fake_1")
+expected = ALPHA * 1.0 + (1 - ALPHA) * 4.0
+ok = abs(updated - expected) < 1e-9 and row["score"] == updated and row["total_count"] == 2
+print(f"  {PASS if ok else FAIL}  EMA update through the fake: {row['score']:.3f} (expected {expected:.3f})")
+results.append(ok)
+
+
+# ─── Test 2: Ordering used by GET /drivers ─────────────────────────────────
+repo.create_driver("drv_fake_2", 0.5)
+repo.create_driver("drv_fake_3", 4.8)
+scores = [d["score"] for d in repo.list_drivers()]
+ok = scores == sorted(scores)
+print(f"  {PASS if ok else FAIL}  list_drivers() sorted ascending: {scores}")
+results.append(ok)
+
+
+# ─── Test 3: Idempotency lookup and unique constraint ──────────────────────
+row = {"driver_id": "drv_fake_1", "trip_id": "t1", "text": "ok", "external_feedback_id": "ext-1"}
+supabase.table("feedback").insert(row).execute()
+found = supabase.table("feedback").select("id").eq("external_feedback_id", "ext-1").execute().data
+try:
+    supabase.table("feedback").insert(row).execute()
+    duplicate_code = None
+except APIError as e:
+    duplicate_code = e.code
+ok = len(found) == 1 and "id" in found[0] and duplicate_code == "23505"
+print(f"  {PASS if ok else FAIL}  Lookup by external_feedback_id → {found}, duplicate insert → {duplicate_code}")
+results.append(ok)
+
+
+# ─── Test 4: Error injection surfaces as APIError ──────────────────────────
+config.error_rate = 1.0
+try:
+    repo.get_driver("drv_fake_1")
+    injected = False
+except APIError:
+    injected = True
+config.error_rate = 0.0
+ok = injected
+print(f"  {PASS if ok else FAIL}  error_rate=1.0 → supabase-py raises APIError")
+results.append(ok)
+
+
+# ─── Test 5: Score writes are timestamped for end-to-end timing ────────────
+writes = fake.state.store.score_writes.get("drv_fake_1", [])
+ok = len(writes) == 2
+print(f"  {PASS if ok else FAIL}  drv_fake_1 score writes recorded: {len(writes)} (create + update)\n")
+results.append(ok)
+
+server.should_exit = True
+
+passed = sum(results)
+print("=" * 60)
+print(f"Results: {passed}/{len(results)} passed")
+print("=" * 60)
@@ -0,0 +1,258 @@
+"""
+test_feedback_log.py
+─────────────────────
+Tests the per-driver feedback history: the local segment store (paging,
+label filter, rollover + compression, workers sharing a directory,
+retention) and GET /driver/{driver_id}/feedback falling back to Supabase.
+Run: python test_feedback_log.py
+
+Runs against the load-test fake PostgREST and a temporary log directory.
+"""
+
+import os
+import socket
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import uvicorn
+
+from loadtest.fake_postgrest import create_app, FakeConfig
+
+with socket.socket() as s:
+    s.bind(("127.0.0.1", 0))
+    PORT = s.getsockname()[1]
+os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{PORT}"
+os.environ["SUPABASE_KEY"] = "fake"
+os.environ["USE_FEEDBACK_RPC"] = "false"
+os.environ["FEEDBACK_LOG_DIR"] = tempfile.mkdtemp()
+os.environ["ALERT_COOLDOWN_DB"] = ":memory:"
+
+from fastapi.testclient import TestClient
+
+from app import feedback_log as feedback_log_module
+from app import processing_tasks
+from app.feedback_log import FeedbackLog
+from app.main import app
+from app.processing_tasks import process_feedback
+
+PASS = "✅ PASS"
+FAIL = "❌ FAIL"
+
+def header(title):
+    print(f"\n── {title} {'─' * (55 - len(title))}\n")
+
+config = FakeConfig()
+fake = create_app(config)
+store = fake.state.store
+server = uvicorn.Server(uvicorn.Config(fake, host="127.0.0.1", port=PORT, log_level="warning"))
+threading.Thread(target=server.run, daemon=True).start()
+while not server.started:
+    time.sleep(0.05)
+
+# Every read looks at the other "workers'" segments straight away
+feedback_log_module.REFRESH_SECONDS = 0
+
+print("=" * 60)
+print("FEEDBACK LOG TESTS")
+print("=" * 60)
+
+results = []
+NOW = time.time()
+
+def row(feedback_id, driver_id, label="neutral"):
+    return {"id": feedback_id, "driver_id": driver_id, "text": f"feedback {feedback_id}",
+            "sentiment": 3.0, "sentiment_label": label, "created_at": "2026-10-19T10:00:00"}
+
+def ids(rows):
+    return [r["id"] for r in rows]
+
+
+# ─── Test 1: Newest first, cursor and label filter ─────────────────────────
+header("STORE: paging from the local index")
+
+log = FeedbackLog(path=tempfile.mkdtemp())
+for i in range(1, 31):
+    log.append(row(i, "drv_a" if i % 3 else "drv_b", "negative" if i % 5 == 0 else "positive"), now=NOW)
+first = log.page("drv_a", limit=5)
+second = log.page("drv_a", before_id=first[-1]["id"], limit=5)
+negatives = log.page("drv_a", label="negative", limit=10)
+ok = ids(first) == [29, 28, 26, 25, 23] and ids(second) == [22, 20, 19, 17, 16] \
+    and ids(negatives) == [25, 20, 10, 5] and "ts" not in first[0] and log.floor() == 1
+print(f"  {PASS if ok else FAIL}  Page 1 {ids(first)}, page 2 {ids(second)}, negatives {ids(negatives)}")
+results.append(ok)
+
+
+# ─── Test 2: Sealed segments are compressed and still readable ─────────────
+header("SEGMENTS: rollover, compression, shared directory")
+
+log = FeedbackLog(path=tempfile.mkdtemp(), segment_bytes=2000)
+for i in range(1, 101):
+    log.append(row(i, f"drv_{i % 4}"), now=NOW + i)
+before = log.page("drv_1", limit=100)
+log.maintain(now=NOW + 200)
+files = os.listdir(log.path)
+compressed = [f for f in files if f.endswith(".log.zst")]
+plain = [f for f in files if f.endswith(".log")]
+after = log.page("drv_1", limit=100)
+ok = len(compressed) > 1 and len(plain) == 1 and after == before and len(after) == 25
+print(f"  {PASS if ok else FAIL}  {len(compressed)} sealed segments compressed, {len(plain)} active; 25 rows read back unchanged")
+results.append(ok)
+
+
+# ─── Test 3: A second worker on the same directory sees both ───────────────
+other = FeedbackLog(path=log.path)
+other._open_segment(NOW + 150)        # its own segment name, as another pid would have
+for i in range(101, 111):
+    other.append(row(i, "drv_1"), now=NOW + i)
+seen_by_first = log.page("drv_1", limit=3)
+seen_by_other = other.page("drv_1", before_id=104, limit=3)
+ok = ids(seen_by_first) == [110, 109, 108] and ids(seen_by_other) == [103, 102, 101]
+print(f"  {PASS if ok else FAIL}  Worker 1 reads worker 2's rows {ids(seen_by_first)}; worker 2 reads worker 1's {ids(seen_by_other)}")
+results.append(ok)
+
+
+# ─── Test 4: Retention expires whole segments and raises the floor ─────────
+header("RETENTION: expired segments → Supabase")
+
+log = FeedbackLog(path=tempfile.mkdtemp(), segment_bytes=2000, retention_hours=1)
+for i in range(1, 61):
+    log.append(row(i, "drv_r"), now=NOW - 7200 + i if i <= 40 else NOW)
+log.maintain(now=NOW)
+kept = log.page("drv_r", limit=100)
+restarted = FeedbackLog(path=log.path, retention_hours=1)
+ok = log.floor() > 1 and min(ids(kept)) >= log.floor() and 60 in ids(kept) \
+    and restarted.page("drv_r", limit=100) == kept and restarted.floor() == log.floor()
+print(f"  {PASS if ok else FAIL}  Floor → {log.floor()}; {len(kept)} rows kept locally; a restarted worker agrees")
+results.append(ok)
+
+
+# ─── Test 5: Endpoint pages local rows, then continues in Supabase ─────────
+header("API: GET /driver/{driver_id}/feedback")
+
+# Written before this host kept a log — only in the database
+for i in range(4):
+    store.rows["feedback"][i + 1] = {
+        "id": i + 1, "driver_id": "drv_api", "trip_id": "t0", "text": f"old {i}", "sentiment": 2.0,
+        "sentiment_label": "negative" if i % 2 else "positive", "entity_type": "driver",
+        "external_feedback_id": None, "lexicon_version": "1.0.0", "created_at": "2026-10-01T00:00:00",
+    }
+store._ids = iter(range(100, 10_000))
+
+for i, text in enumerate(["Great driver, very polite", "Rude and late", "Okay ride", "Terrible, unsafe driving"]):
+    process_feedback(SimpleNamespace(driver_id="drv_api", trip_id=f"t{i}", text=text,
+                                     entity_type="driver", external_feedback_id=f"hist-{i}"))
+
+client = TestClient(app)
+pages, cursor, sources = [], None, []
+while True:
+    params = {"limit": 3} if cursor is None else {"limit": 3, "cursor": cursor}
+    body = client.get("/driver/drv_api/feedback", params=params).json()
+    pages.append(ids(body["data"]))
+    sources.append(body["source"])
+    cursor = body["next_cursor"]
+    if cursor is None:
+        break
+walked = [i for page in pages for i in page]
+expected = sorted(ids(store.rows["feedback"].values()), reverse=True)
+ok = walked == expected and sources[0] == "local" and sources[1] == "mixed" and sources[-1] == "supabase"
+print(f"  {PASS if ok else FAIL}  Pages {pages} via {sources}")
+results.append(ok)
+
+store.requests.clear()
+body = client.get("/driver/drv_api/feedback", params={"limit": 2}).json()
+local_only = "GET feedback" not in store.requests
+negatives = client.get("/driver/drv_api/feedback", params={"label": "negative", "limit": 10}).json()["data"]
+bad = client.get("/driver/drv_api/feedback", params={"limit": 1000}).status_code
+ok = local_only and all(r["sentiment_label"] == "negative" for r in negatives) \
+    and {2, 4} <= set(ids(negatives)) and bad == 422
+print(f"  {PASS if ok else FAIL}  Full local page → no DB query; label=negative → {ids(negatives)}; limit=1000 → {bad}")
+results.append(ok)
+
+
+# ─── Test 6: A failing log never costs a score update or an alert ─────────
+header("FAILURE: log append raises")
+
+alerts = []
+disk_full = OSError(28, "No space left on device")
+with patch.object(processing_tasks.feedback_log, "append", side_effect=disk_full), \
+        patch.object(processing_tasks._alert_service, "_send_alert",
+                     side_effect=lambda d, s, reason=None: alerts.append(d)):
+    process_feedback(SimpleNamespace(driver_id="drv_full_multi", trip_id="t1", text="Drunk, rude, terrible driver",
+                                     entity_type="driver", external_feedback_id="full-1"))
+    processing_tasks._rpc_enabled = True
+    try:
+        process_feedback(SimpleNamespace(driver_id="drv_full_rpc", trip_id="t1", text="Drunk, rude, terrible driver",
+                                         entity_type="driver", external_feedback_id="full-2"))
+    finally:
+        processing_tasks._rpc_enabled = False
+scored = [d for d in ("drv_full_multi", "drv_full_rpc") if d in store.rows["driver_sentiment"]]
+ok = scored == ["drv_full_multi", "drv_full_rpc"] and alerts == ["drv_full_multi", "drv_full_rpc"]
+print(f"  {PASS if ok else FAIL}  Append raised ENOSPC on both paths; scored {scored}, alerted {alerts}")
+results.append(ok)
+
+missed = [client.get(f"/driver/{d}/feedback").json() for d in ("drv_full_multi", "drv_full_rpc")]
+ok = all(len(body["data"]) == 1 and body["source"] == "supabase" for body in missed) \
+    and processing_tasks.feedback_log.floor() > max(body["data"][0]["id"] for body in missed)
+print(f"  {PASS if ok else FAIL}  Floor raised past the unlogged rows; both served from Supabase")
+results.append(ok)
+
+
+# ─── Test 7: A failing score update still leaves the row in the history ───
+header("FAILURE: score update raises after the insert")
+
+def flaky_update(driver_id, new_score):
+    if new_score is flaky_update.failing:
+        raise ConnectionError("supabase timeout")
+    return new_score
+
+flaky_update.failing = None
+with patch.object(processing_tasks._driver_service, "update_driver_score", side_effect=flaky_update), \
+        patch.object(processing_tasks, "RETRY_DELAY", 0):
+    for i, text in enumerate(["Nice ride", "Okay ride", "Clean car"]):
+        flaky_update.failing = processing_tasks._sentiment_service.analyze(text)["score"] if i == 1 else None
+        process_feedback(SimpleNamespace(driver_id="drv_gap", trip_id=f"t{i}", text=text,
+                                         entity_type="driver", external_feedback_id=f"gap-{i}"))
+history = client.get("/driver/drv_gap/feedback").json()
+in_db = sorted((r["id"] for r in store.rows["feedback"].values() if r["driver_id"] == "drv_gap"), reverse=True)
+ok = ids(history["data"]) == in_db and len(in_db) == 3 and history["source"] == "local"
+print(f"  {PASS if ok else FAIL}  DB {in_db}; endpoint {ids(history['data'])} via {history['source']}")
+results.append(ok)
+
+
+# ─── Test 8: RPC rows are logged with the database's created_at ──────────
+processing_tasks._rpc_enabled = True
+try:
+    process_feedback(SimpleNamespace(driver_id="drv_rpc_time", trip_id="t1", text="Smooth ride",
+                                     entity_type="driver", external_feedback_id="time-1"))
+finally:
+    processing_tasks._rpc_enabled = False
+time.sleep(0.01)   # a worker-clock timestamp taken now would differ
+logged = client.get("/driver/drv_rpc_time/feedback").json()
+stored_row = store.rows["feedback"][logged["data"][0]["id"]] if logged["data"] else {}
+ok = logged["source"] == "local" and logged["data"][0]["created_at"] == stored_row.get("created_at")
+print(f"  {PASS if ok else FAIL}  Local row created_at {logged['data'][0]['created_at'] if logged['data'] else None} matches the DB row")
+results.append(ok)
+
+
+# ─── Test 9: Page cost with a busy index ───────────────────────────────────
+header("SCALE: 200k feedbacks across 2k drivers")
+
+log = FeedbackLog(path=tempfile.mkdtemp())
+for i in range(1, 200_001):
+    log.append(row(i, f"drv_{i % 2000}", "negative" if i % 7 == 0 else "positive"), now=NOW)
+started = time.perf_counter()
+for d in range(200):
+    log.page(f"drv_{d}", label="negative", limit=20)
+elapsed = (time.perf_counter() - started) / 200 * 1000
+ok = elapsed < 20
+print(f"  {PASS if ok else FAIL}  Filtered page of 20 in {elapsed:.2f} ms on average\n")
+results.append(ok)
+
+
+passed = sum(results)
+print("=" * 60)
+print(f"Results: {passed}/{len(results)} passed")
+print("=" * 60)
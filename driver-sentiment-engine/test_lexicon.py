@@ -0,0 +1,133 @@
+"""
+test_lexicon.py
+────────────────
+Tests versioned, hot-reloadable lexicons: loading, compile hooks, atomic
+swap under concurrent readers, and rejection of bad files.
+Run: python test_lexicon.py
+
+Uses a temporary lexicon directory — the bundled files are not modified.
+"""
+
+import json
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+from app.utils.lexicon import LexiconRegistry, LexiconError, LEXICON_DIR, lexicons
+from app.services.sentiment_service import SentimentService
+
+PASS = "✅ PASS"
+FAIL = "❌ FAIL"
+
+def header(title):
+    print(f"\n── {title} {'─' * (55 - len(title))}\n")
+
+print("=" * 60)
+print("LEXICON TESTS")
+print("=" * 60)
+
+results = []
+
+tmp = Path(tempfile.mkdtemp())
+shutil.copy(LEXICON_DIR / "lexicon-1.0.0.json", tmp)
+bundled = json.loads((LEXICON_DIR / "lexicon-1.0.0.json").read_text(encoding="utf-8"))
+
+def write_version(version, **changes):
+    doc = {**bundled, "version": version}
+    for section, entries in changes.items():
+        doc[section] = {**bundled[section], **entries}
+    (tmp / f"lexicon-{version}.json").write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+
+
+# ─── Test 1: Bundled lexicon is what the service scores with ───────────────
+header("LOAD: bundled lexicon drives analysis and is recorded")
+
+r = SentimentService().analyze("driver is drunk")
+ok = r["lexicon_version"] == lexicons.current.version and r["label"] == "negative"
+print(f"  {PASS if ok else FAIL}  analyze() → label={r['label']}, lexicon_version={r['lexicon_version']}")
+results.append(ok)
+
+
+# ─── Test 2: Compile hooks run before the version goes live ────────────────
+registry = LexiconRegistry(directory=tmp)
+registry.register_compiler("word_count", lambda lex: len(lex.driver_lexicon))
+write_version("1.1.0", driver_lexicon={"honking": -2.0})
+lex = registry.reload()
+ok = lex.version == "1.1.0" and lex.compiled["word_count"] == len(bundled["driver_lexicon"]) + 1
+print(f"  {PASS if ok else FAIL}  Newest file picked (1.1.0), hook output ready: {lex.compiled['word_count']} words")
+results.append(ok)
+
+
+# ─── Test 3: Versions sort numerically, and can be pinned ──────────────────
+write_version("1.10.0")
+write_version("1.9.0")
+ok = registry.available_versions()[-1] == "1.10.0" and registry.reload("1.0.0").version == "1.0.0"
+print(f"  {PASS if ok else FAIL}  Available: {registry.available_versions()}, pin 1.0.0 works")
+results.append(ok)
+
+
+# ─── Test 4: A bad file never replaces the live lexicon ────────────────────
+header("SAFETY: invalid files are rejected, live version kept")
+
+bad_cases = {
+    "2.0.0": {"driver_lexicon": {"rude": 9.0}},        # weight out of range
+    "2.0.1": {"slang_map": {r"\b(unclosed": "x"}},    # broken regex
+}
+for version, changes in bad_cases.items():
+    write_version(version, **changes)
+rejected = 0
+for version in bad_cases:
+    try:
+        registry.reload(version)
+    except LexiconError:
+        rejected += 1
+ok = rejected == 2 and registry.current.version == "1.0.0"
+print(f"  {PASS if ok else FAIL}  {rejected}/2 bad files rejected, still serving {registry.current.version}")
+results.append(ok)
+for version in bad_cases:
+    (tmp / f"lexicon-{version}.json").unlink()
+
+
+# ─── Test 5: Readers never see a torn lexicon during swaps ─────────────────
+header("SWAP: concurrent readers vs repeated reloads")
+
+registry.register_compiler("tag", lambda lex: lex.version)
+stop = threading.Event()
+torn = []
+
+def reader():
+    while not stop.is_set():
+        lex = registry.current
+        if lex.compiled.get("tag") != lex.version:
+            torn.append(lex.version)
+
+readers = [threading.Thread(target=reader) for _ in range(4)]
+for t in readers: t.start()
+for i in range(200):
+    registry.reload("1.1.0" if i % 2 else "1.9.0")
+stop.set()
+for t in readers: t.join()
+
+ok = not torn
+print(f"  {PASS if ok else FAIL}  200 swaps under 4 readers → {len(torn)} inconsistent reads")
+results.append(ok)
+
+
+# ─── Test 6: Editing a loaded version in place doesn't swap it ─────────────
+header("IMMUTABLE: same version, new content")
+
+live = registry.reload("1.9.0")
+write_version("1.9.0", driver_lexicon={"honking": -3.5})
+kept = registry.reload("1.9.0")
+fresh = LexiconRegistry(directory=tmp).reload("1.9.0")
+ok = kept is live and "honking" not in kept.driver_lexicon and fresh.digest != live.digest
+print(f"  {PASS if ok else FAIL}  Edited 1.9.0 ignored (still {kept.digest}); a fresh load sees digest {fresh.digest}\n")
+results.append(ok)
+
+shutil.rmtree(tmp)
+
+passed = sum(results)
+print("=" * 60)
+print(f"Results: {passed}/{len(results)} passed")
+print("=" * 60)
@@ -0,0 +1,72 @@
+"""
+test_logger.py
+───────────────
+Tests the logging setup: sampling, context fields, and JSON output.
+Run: python test_logger.py
+"""
+
+import json
+import logging
+
+from app.logger import SamplingFilter, ContextFilter, JsonFormatter, log_context
+
+PASS = "✅ PASS"
+FAIL = "❌ FAIL"
+
+print("=" * 60)
+print("LOGGER TESTS")
+print("=" * 60 + "\n")
+
+results = []
+
+def make_record(level=logging.INFO, msg="EMA → %.3f/5", args=(2.5,), **extra):
+    record = logging.LogRecord("app.logger", level, __file__, 0, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+# ─── Test 1: Sampled INFO lines are dropped at rate 0 ──────────────────────
+drop_all = SamplingFilter(0.0)
+ok = not drop_all.filter(make_record(sample=True))
+print(f"  {PASS if ok else FAIL}  Sampled INFO line dropped at LOG_SAMPLE_RATE=0")
+results.append(ok)
+
+
+# ─── Test 2: Unsampled lines, warnings and errors always kept ──────────────
+ok = drop_all.filter(make_record()) \
+    and drop_all.filter(make_record(level=logging.WARNING, sample=True)) \
+    and drop_all.filter(make_record(level=logging.ERROR, sample=True))
+print(f"  {PASS if ok else FAIL}  Alerts (unsampled INFO), warnings and errors kept at rate 0")
+results.append(ok)
+
+
+# ─── Test 3: Sampling rate is roughly honoured ─────────────────────────────
+tenth = SamplingFilter(0.1)
+kept = sum(tenth.filter(make_record(sample=True)) for _ in range(10_000))
+ok = 700 < kept < 1300
+print(f"  {PASS if ok else FAIL}  LOG_SAMPLE_RATE=0.1 kept {kept}/10000 sampled lines")
+results.append(ok)
+
+
+# ─── Test 4: Context fields end up in the JSON record ──────────────────────
+record = make_record()
+with log_context(driver_id="drv_9921", trace_id="t-123"):
+    ContextFilter().filter(record)
+line = json.loads(JsonFormatter().format(record))
+ok = line["driver_id"] == "drv_9921" and line["trace_id"] == "t-123" and line["msg"] == "EMA → 2.500/5"
+print(f"  {PASS if ok else FAIL}  JSON line: {line}")
+results.append(ok)
+
+
+# ─── Test 5: Context does not leak outside the block ───────────────────────
+outside = make_record()
+ContextFilter().filter(outside)
+ok = outside.driver_id is None and "driver_id" not in json.loads(JsonFormatter().format(outside))
+print(f"  {PASS if ok else FAIL}  No driver_id outside log_context\n")
+results.append(ok)
+
+
+passed = sum(results)
+print("=" * 60)
+print(f"Results: {passed}/{len(results)} passed")
+print("=" * 60)
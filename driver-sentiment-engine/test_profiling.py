@@ -0,0 +1,117 @@
+"""
+test_profiling.py
+──────────────────
+Tests trace propagation into background work and the on-demand profiler.
+Run: python test_profiling.py
+
+No DB involved — the scheduler handler and profiled work are plain functions.
+"""
+
+import os
+import time
+from types import SimpleNamespace
+
+os.environ["ADMIN_TOKEN"] = "test-admin-token"
+os.environ["ALERT_COOLDOWN_DB"] = ":memory:"
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.profiling import SamplingProfiler
+from app.scheduler import FeedbackScheduler
+from app.tracing import trace, current_trace_id
+
+PASS = "✅ PASS"
+FAIL = "❌ FAIL"
+
+def header(title):
+    print(f"\n── {title} {'─' * (55 - len(title))}\n")
+
+print("=" * 60)
+print("TRACING & PROFILING TESTS")
+print("=" * 60)
+
+results = []
+
+
+# ─── Test 1: Trace ID follows feedback onto the shard worker ───────────────
+header("TRACE: submitting request's ID seen by the background task")
+
+seen = []
+sched = FeedbackScheduler(lambda fb: seen.append(current_trace_id()), shards=2)
+sched.start()
+with trace("trace-abc") as trace_id:
+    sched.submit(SimpleNamespace(driver_id="drv_1", text="fine"), trace_id=trace_id)
+sched.stop(timeout=5)
+
+ok = seen == ["trace-abc"] and current_trace_id() is None
+print(f"  {PASS if ok else FAIL}  Worker saw trace {seen}, none leaked afterwards")
+results.append(ok)
+
+
+# ─── Test 2: HTTP responses carry a trace header ───────────────────────────
+client = TestClient(app)
+r1 = client.get("/health")
+r2 = client.get("/health", headers={"X-Trace-Id": "upstream-123"})
+ok = len(r1.headers.get("X-Trace-Id", "")) == 16 and r2.headers.get("X-Trace-Id") == "upstream-123"
+print(f"  {PASS if ok else FAIL}  New ID {r1.headers.get('X-Trace-Id')!r}, upstream ID echoed {r2.headers.get('X-Trace-Id')!r}")
+results.append(ok)
+
+
+# ─── Test 3: Profiler off → nothing sampled ────────────────────────────────
+header("PROFILER: off by default, samples 1 in N when on")
+
+prof = SamplingProfiler()
+ok = not prof.should_sample() and prof.report()["samples"] == 0
+print(f"  {PASS if ok else FAIL}  Inactive profiler never samples")
+results.append(ok)
+
+
+# ─── Test 4: 1-in-N selection and folded stacks ────────────────────────────
+def busy_scoring_loop(seconds):
+    end = time.perf_counter() + seconds
+    x = 0
+    while time.perf_counter() < end:
+        x += 1
+    return x
+
+prof.start(sample_every=3, duration_seconds=None, interval_ms=1)
+picked = 0
+for _ in range(9):
+    if prof.should_sample():
+        picked += 1
+        with prof.profiled("t-1"):
+            busy_scoring_loop(0.05)
+prof.stop()
+report = prof.report()
+
+ok = picked == 3 and report["profiled_runs"] == 3 and report["samples"] > 0 \
+    and "busy_scoring_loop" in report["folded"]
+print(f"  {PASS if ok else FAIL}  {picked}/9 runs profiled, {report['samples']} stack samples")
+print(f"         Top frame: {report['top_frames'][0] if report['top_frames'] else None}")
+results.append(ok)
+
+
+# ─── Test 5: Time window stops the profiler on its own ─────────────────────
+prof.start(sample_every=1, duration_seconds=0.05, interval_ms=1)
+time.sleep(0.3)
+ok = not prof.active
+print(f"  {PASS if ok else FAIL}  duration_seconds=0.05 → profiler inactive after window")
+results.append(ok)
+
+
+# ─── Test 6: Admin guard ───────────────────────────────────────────────────
+header("ADMIN: profiling endpoints need the admin token")
+
+no_token  = client.get("/admin/profiling")
+bad_token = client.get("/admin/profiling", headers={"X-Admin-Token": "nope"})
+good      = client.get("/admin/profiling", headers={"X-Admin-Token": "test-admin-token"})
+ok = no_token.status_code == 403 and bad_token.status_code == 403 and good.status_code == 200
+print(f"  {PASS if ok else FAIL}  no token → {no_token.status_code}, wrong → {bad_token.status_code}, right → {good.status_code}\n")
+results.append(ok)
+
+
+passed = sum(results)
+print("=" * 60)
+print(f"Results: {passed}/{len(results)} passed")
+print("=" * 60)
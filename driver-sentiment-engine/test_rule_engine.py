@@ -0,0 +1,157 @@
+"""
+test_rule_engine.py
+────────────────────
+Tests the fleet-wide alert-rule sweep: the array-backed driver state, the
+score-drop and negative-streak rules, the cooldown/Slack hand-off, and a
+full-fleet sweep timing.
+Run: python test_rule_engine.py
+
+Uses an in-memory cooldown DB and a patched Slack sender — no DB required.
+"""
+
+import time
+from unittest.mock import MagicMock, patch
+
+from app.services.rule_engine import FleetState, RuleEngine, RULES, SCORE_DROP_WINDOW
+from app.services.alert_service import AlertService
+from app.repositories.cooldown_repository import CooldownRepository
+
+PASS = "✅ PASS"
+FAIL = "❌ FAIL"
+
+def header(title):
+    print(f"\n── {title} {'─' * (55 - len(title))}\n")
+
+print("=" * 60)
+print("RULE ENGINE TESTS")
+print("=" * 60)
+
+results = []
+NOW = time.time()
+
+def make_engine(state):
+    service = AlertService(cooldown=CooldownRepository(":memory:"))
+    service.repo = MagicMock()
+    return RuleEngine(state, service, rules=list(RULES.values()), interval=0), service
+
+
+# ─── Test 1: Columns grow past the initial capacity ────────────────────────
+header("STATE: array-backed columns")
+
+state = FleetState(capacity=4, history_slots=8)
+for i in range(10):
+    for j in range(12):      # more updates than history slots → ring wraps
+        state.record(f"drv_{i}", 3.0 + j / 100, "neutral", at=NOW - 100 + j)
+cols = state.columns()
+ok = len(state) == 10 and cols["score"].shape == (10,) and cols["history_ts"].shape == (10, 8) \
+    and abs(cols["score"][9] - 3.11) < 1e-9 and state.history_score[9].max() > 3.10
+print(f"  {PASS if ok else FAIL}  10 drivers in capacity 4 → {len(state.score)} rows, latest score {cols['score'][9]:.2f}")
+results.append(ok)
+
+
+# ─── Test 2: Score drop counts only inside the window ──────────────────────
+header("RULES: score_drop_24h and negative_streak")
+
+state = FleetState()
+state.record("drv_drop", 4.5, "positive", at=NOW - 3600)
+state.record("drv_drop", 3.2, "negative", at=NOW - 60)
+state.record("drv_slow", 4.5, "positive", at=NOW - SCORE_DROP_WINDOW - 3600)   # peak is too old
+state.record("drv_slow", 3.2, "negative", at=NOW - 60)
+state.record("drv_small", 4.0, "positive", at=NOW - 3600)
+state.record("drv_small", 3.5, "neutral", at=NOW - 60)
+with state.lock:
+    fired, drop = RULES["score_drop_24h"].evaluate(state.columns(), NOW)
+hits = [state.driver_ids[i] for i in fired.nonzero()[0]]
+ok = hits == ["drv_drop"] and abs(drop[0] - 1.3) < 1e-6
+print(f"  {PASS if ok else FAIL}  Fired for {hits}; drop {drop[0]:.2f} (old peak and 0.5 drop ignored)")
+results.append(ok)
+
+
+# ─── Test 3: Negative streak looks at the last 10 labels only ──────────────
+state = FleetState()
+for label in ["negative", "positive", "negative", "neutral", "negative"]:
+    state.record("drv_neg", 2.0, label, at=NOW)
+for label in ["negative"] * 3 + ["positive"] * 10:
+    state.record("drv_recovered", 4.0, label, at=NOW)
+for label in ["negative", "negative"]:
+    state.record("drv_two", 2.0, label, at=NOW)
+with state.lock:
+    fired, negatives = RULES["negative_streak"].evaluate(state.columns(), NOW)
+hits = [state.driver_ids[i] for i in fired.nonzero()[0]]
+ok = hits == ["drv_neg"] and negatives.tolist() == [3, 0, 2]
+print(f"  {PASS if ok else FAIL}  Fired for {hits}; negatives in window {negatives.tolist()}")
+results.append(ok)
+
+
+# ─── Test 4: Sweep → cooldown → Slack, once per rule per window ────────────
+header("SWEEP: cooldown and Slack hand-off")
+
+state = FleetState()
+state.record("drv_a", 4.5, "negative", at=NOW - 600)
+state.record("drv_a", 2.9, "negative", at=NOW - 300)
+state.record("drv_a", 2.8, "negative", at=NOW - 60)
+engine, service = make_engine(state)
+sent = []
+with patch.object(service, "_send_alert", side_effect=lambda d, s, reason=None: sent.append((d, reason))):
+    first = engine.sweep(now=NOW)
+    second = engine.sweep(now=NOW)
+ok = sorted(first) == [("drv_a", "negative_streak"), ("drv_a", "score_drop_24h")] and second == [] \
+    and len(sent) == 2 and all(reason for _, reason in sent)
+print(f"  {PASS if ok else FAIL}  First sweep sent {len(first)}, second sweep sent {len(second)}")
+for driver_id, reason in sent:
+    print(f"         {driver_id}: {reason}")
+results.append(ok)
+stats = engine.stats()["last_sweep"]
+ok = stats["drivers"] == 1 and stats["matched"] == 2 and stats["alerts_sent"] == 0
+print(f"  {PASS if ok else FAIL}  Stats: {stats['matched']} matched, {stats['alerts_sent']} sent (cooldown)")
+results.append(ok)
+
+
+# ─── Test 5: Rule cooldowns don't block the threshold alert ────────────────
+service.repo.get_driver.return_value = {"last_alert_at": None}
+threshold = []
+with patch.object(service, "_send_alert", side_effect=lambda d, s, reason=None: threshold.append(d)):
+    service.check_and_alert("drv_a", score=2.0)
+ok = threshold == ["drv_a"]
+print(f"  {PASS if ok else FAIL}  Threshold alert still fires after rule alerts: {threshold}")
+results.append(ok)
+
+
+# ─── Test 6: Whole-fleet sweep timing ──────────────────────────────────────
+header("SCALE: one sweep over 50k drivers")
+
+state = FleetState(capacity=50000, history_slots=16)
+for i in range(50000):
+    state.record(f"drv_{i}", 4.0, "positive", at=NOW - 3600)
+    state.record(f"drv_{i}", 2.5 if i % 1000 == 0 else 3.9, "neutral", at=NOW - 60)
+engine, service = make_engine(state)
+with patch.object(service, "_send_alert"):
+    started = time.perf_counter()
+    sent = engine.sweep(now=NOW)
+    elapsed = time.perf_counter() - started
+eval_ms = engine.stats()["last_sweep"]["eval_ms"]
+ok = len(sent) == 50 and eval_ms < 1000
+print(f"  {PASS if ok else FAIL}  {len(sent)} alerts; rules evaluated in {eval_ms:.1f} ms, sweep total {elapsed * 1000:.0f} ms")
+results.append(ok)
+
+
+# ─── Test 7: Warm-state round trip keeps ring order ────────────────────────
+header("WARM STATE: dump / load")
+
+state = FleetState(history_slots=4)
+for j in range(6):
+    state.record("drv_w", float(j), "negative" if j % 2 else "positive", at=NOW - 100 + j)
+rows = state.dump()
+restored = FleetState(history_slots=4)
+restored.record("drv_new", 3.0, "neutral", at=NOW)
+restored.load(rows + [["drv_new", [NOW - 5], [1.0], [-1]]])
+ok = rows[0][2] == [2.0, 3.0, 4.0, 5.0] and restored.dump()[1] == rows[0] \
+    and restored.dump()[0][2] == [3.0]
+print(f"  {PASS if ok else FAIL}  History restored oldest first: {rows[0][2]}; newer driver state kept\n")
+results.append(ok)
+
+
+passed = sum(results)
+print("=" * 60)
+print(f"Results: {passed}/{len(results)} passed")
+print("=" * 60)
@@ -0,0 +1,154 @@
+"""
+test_scheduler.py
+──────────────────
+Tests the priority-lane scheduler: intake classification, lane ordering,
+starvation protection, per-lane wait metrics, and driver sharding.
+Run: python test_scheduler.py
+
+No DB or NLP model involved — the handler is a plain function.
+"""
+
+import threading
+from types import SimpleNamespace
+
+from app.scheduler import classify_priority, shard_for, LaneQueue, FeedbackScheduler, LANES
+
+PASS = "✅ PASS"
+FAIL = "❌ FAIL"
+
+def header(title):
+    print(f"\n── {title} {'─' * (55 - len(title))}\n")
+
+print("=" * 60)
+print("PRIORITY SCHEDULER TESTS")
+print("=" * 60)
+
+results = []
+
+
+# ─── Test 1: Intake classification ─────────────────────────────────────────
+header("CLASSIFY: lexicon and slang negatives pick the lane")
+
+cases = [
+    ("driver was drunk",                 "critical"),
+    ("HARASSMENT during the ride",       "critical"),
+    ("he was threatening me",            "critical"),
+    ("driver looked totally wasted",     "critical"),   # slang → drunk
+    ("a bit rude and late",              "negative"),
+    ("driver was late af",               "negative"),   # slang → very late
+    ("great ride, very polite",          "normal"),
+    ("",                                 "normal"),
+]
+for text, expected in cases:
+    got = classify_priority(text)
+    ok = got == expected
+    results.append(ok)
+    print(f"  {PASS if ok else FAIL}  {text!r:<36} → {got} (expected {expected})")
+
+
+# ─── Test 2: Strict priority when nothing is starved ───────────────────────
+header("ORDER: critical before negative before normal")
+
+q = LaneQueue(starvation_limit=100)
+q.put("normal", "n1")
+q.put("negative", "g1")
+q.put("critical", "c1")
+order = [q.get(timeout=1)[0][0] for _ in range(3)]
+ok = order == list(LANES)
+results.append(ok)
+print(f"  {PASS if ok else FAIL}  Dispatch order: {order}\n")
+
+
+# ─── Test 3: Starvation protection ─────────────────────────────────────────
+header("STARVATION: normal lane still served under critical backlog")
+
+q2 = LaneQueue(starvation_limit=3)
+for i in range(10):
+    q2.put("critical", f"c{i}")
+q2.put("normal", "n0")
+first_five = [q2.get(timeout=1)[0][0] for _ in range(5)]
+ok = "normal" in first_five[:4]
+results.append(ok)
+print(f"  {PASS if ok else FAIL}  First dispatches with limit=3: {first_five}\n")
+
+
+# ─── Test 4: Per-lane wait metrics ─────────────────────────────────────────
+header("METRICS: dispatch counts and wait percentiles per lane")
+
+stats = q2.stats()
+ok = stats["critical"]["dispatched"] == 4 and stats["normal"]["dispatched"] == 1 \
+    and all("wait_p95_ms" in s for s in stats.values())
+results.append(ok)
+print(f"  {PASS if ok else FAIL}  {stats}\n")
+
+
+# ─── Test 5: Same driver keeps arrival order across lanes ──────────────────
+header("ORDERING: urgent feedback pulls the driver's older items with it")
+
+q3 = LaneQueue(starvation_limit=100)
+q3.put("normal",   "a1", key="drv_a")
+q3.put("normal",   "b1", key="drv_b")
+q3.put("critical", "a2", key="drv_a")
+batch = [item for _, item, _ in q3.get(timeout=1)]
+rest  = [item for _, item, _ in q3.get(timeout=1)]
+ok = batch == ["a1", "a2"] and rest == ["b1"] and q3.depth() == 0
+results.append(ok)
+print(f"  {PASS if ok else FAIL}  First batch {batch}, then {rest}, depth left {q3.depth()}\n")
+
+
+# ─── Test 6: Shard routing is stable and per-driver order is preserved ─────
+header("SHARDS: each driver owned by one shard, updates in order")
+
+ok = shard_for("drv_42", 8) == shard_for("drv_42", 8) and 0 <= shard_for("drv_42", 8) < 8
+results.append(ok)
+print(f"  {PASS if ok else FAIL}  drv_42 → shard {shard_for('drv_42', 8)} of 8 (stable)")
+
+seen = {}
+seen_lock = threading.Lock()
+
+def record(fb):
+    with seen_lock:
+        seen.setdefault(fb.driver_id, []).append(fb.seq)
+
+sharded = FeedbackScheduler(record, shards=4)
+for i in range(200):
+    text = "drunk" if i % 7 == 0 else "fine"
+    sharded.submit(SimpleNamespace(driver_id=f"drv_{i % 10}", text=text, seq=i))
+sharded.start()
+sharded.stop(timeout=5)
+
+ok = all(v == sorted(v) for v in seen.values()) and sum(len(v) for v in seen.values()) == 200
+results.append(ok)
+print(f"  {PASS if ok else FAIL}  200 feedbacks over 10 drivers, each driver's sequence in order")
+
+stats = sharded.stats()
+ok = len(stats["shards"]) == 4 and sum(s["processed"] for s in stats["shards"]) == 200 and "skew" in stats
+results.append(ok)
+print(f"  {PASS if ok else FAIL}  Per-shard processed: {[s['processed'] for s in stats['shards']]}, skew={stats['skew']}\n")
+
+
+# ─── Test 7: Shards process everything, then drain on stop ─────────────────
+header("WORKERS: every submitted feedback is handled once")
+
+handled = []
+lock = threading.Lock()
+
+def handler(fb):
+    with lock:
+        handled.append(fb.driver_id)
+
+sched = FeedbackScheduler(handler, shards=3)
+sched.start()
+for i in range(50):
+    sched.submit(SimpleNamespace(driver_id=f"drv_{i}", text="drunk" if i % 5 == 0 else "fine"))
+sched.stop(timeout=5)
+
+ok = sorted(handled) == sorted(f"drv_{i}" for i in range(50))
+results.append(ok)
+print(f"  {PASS if ok else FAIL}  Handled {len(handled)}/50 feedbacks\n")
+
+
+passed = sum(results)
+print("=" * 60)
+print(f"Results: {passed}/{len(results)} passed")
+print("=" * 60)
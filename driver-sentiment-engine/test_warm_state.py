@@ -0,0 +1,185 @@
+"""
+test_warm_state.py
+───────────────────
+Tests warm restarts: the hot-state snapshot round-trip, rejection of
+corrupt / stale / foreign files, the caches it carries, and /ready.
+Run: python test_warm_state.py
+
+Uses a temporary snapshot file and mock repositories — no DB required.
+"""
+
+import os
+import struct
+import tempfile
+import time
+from datetime import datetime
+from unittest.mock import MagicMock
+
+os.environ["ALERT_COOLDOWN_DB"] = ":memory:"
+
+from fastapi.testclient import TestClient
+
+from app.warm_state import WarmStateStore, encode, decode, WarmStateError
+from app.repositories.cooldown_repository import CooldownRepository
+from app.services.driver_service import DriverService, StaleDriverState, ALPHA
+from app.services.sentiment_service import SentimentService, analysis_cache
+from app.utils.lexicon import lexicons
+from app.utils.lru_cache import LRUCache
+from app import main, processing_tasks
+
+PASS = "✅ PASS"
+FAIL = "❌ FAIL"
+
+def header(title):
+    print(f"\n── {title} {'─' * (55 - len(title))}\n")
+
+print("=" * 60)
+print("WARM STATE TESTS")
+print("=" * 60)
+
+results = []
+path = os.path.join(tempfile.mkdtemp(), "warm-state.bin")
+
+def make_store(cache, cooldown, max_age=3600):
+    store = WarmStateStore(path=path, max_age=max_age)
+    store.register("scores", dump=lambda: [[k, v] for k, v in cache.items()],
+                   load=lambda rows: cache.load((k, v) for k, v in rows))
+    store.register("cooldown", dump=cooldown.dump, load=cooldown.load)
+    return store
+
+
+# ─── Test 1: Write → restore into a fresh process ──────────────────────────
+header("SNAPSHOT: round trip")
+
+cache = LRUCache(100)
+for i in range(50):
+    cache.put(f"drv_{i}", [round(i / 10, 2), i + 1])
+cooldown = CooldownRepository(":memory:")
+cooldown.seed("drv_1", datetime(2026, 1, 2, 3, 4, 5))
+cooldown.seed("drv_2", None)
+size = make_store(cache, cooldown).write()
+
+fresh_cache, fresh_cooldown = LRUCache(100), CooldownRepository(":memory:")
+restored = make_store(fresh_cache, fresh_cooldown).restore()
+ok = restored == {"scores": 50, "cooldown": 2} and fresh_cache.items() == cache.items() \
+    and fresh_cooldown.get_last_alert("drv_1") == datetime(2026, 1, 2, 3, 4, 5) \
+    and fresh_cooldown.is_known("drv_2")
+print(f"  {PASS if ok else FAIL}  {size} bytes written, restored {restored}, LRU order kept")
+results.append(ok)
+
+
+# ─── Test 2: Restored entries never overwrite newer ones ───────────────────
+newer = LRUCache(100)
+newer.put("drv_3", [4.9, 99])
+make_store(newer, CooldownRepository(":memory:")).restore()
+ok = newer.get("drv_3") == [4.9, 99] and len(newer) == 50
+print(f"  {PASS if ok else FAIL}  Entry written after startup kept: drv_3 → {newer.get('drv_3')}")
+results.append(ok)
+
+
+# ─── Test 3: Corrupt, truncated, stale and foreign files are ignored ───────
+header("SAFETY: unusable snapshots start cold")
+
+good = open(path, "rb").read()
+flipped = bytearray(good)
+flipped[-5] ^= 0xFF
+old = encode({"scores": []}, created_at=time.time() - 7200)
+wrong_version = bytearray(good)
+struct.pack_into("<H", wrong_version, 8, 99)
+cases = {
+    "corrupt":   bytes(flipped),
+    "truncated": good[:len(good) // 2],
+    "stale":     old,
+    "version":   bytes(wrong_version),
+    "foreign":   b"PK\x03\x04" + good[4:],
+    "empty":     b"",
+}
+ignored = []
+for name, data in cases.items():
+    with open(path, "wb") as f:
+        f.write(data)
+    target = LRUCache(100)
+    if make_store(target, CooldownRepository(":memory:")).restore() == {} and len(target) == 0:
+        ignored.append(name)
+ok = ignored == list(cases)
+print(f"  {PASS if ok else FAIL}  Ignored: {ignored}")
+results.append(ok)
+
+try:
+    decode(bytes(flipped))
+    reason = None
+except WarmStateError as e:
+    reason = str(e)
+ok = reason == "checksum mismatch"
+print(f"  {PASS if ok else FAIL}  Flipped byte detected: {reason!r}")
+results.append(ok)
+
+
+# ─── Test 4: Analysis cache serves repeated texts ──────────────────────────
+header("CACHES: what the snapshot carries")
+
+svc = SentimentService()
+first = svc.analyze("Great ride, very polite")
+again = svc.analyze("Great ride, very polite")
+ok = first == again and analysis_cache.get((lexicons.current.digest, "Great ride, very polite")) == first
+print(f"  {PASS if ok else FAIL}  Repeat text served from cache: {again['label']} {again['score']}")
+results.append(ok)
+
+# A snapshot from a worker that loaded different content under the same version
+live = lexicons.current.digest
+processing_tasks._load_analysis([
+    ["0123456789abcdef", "Okay-ish ride", 4.9, 0.96, "positive"],
+    [live, "Fine ride", 3.1, 0.24, "positive"],
+])
+ok = analysis_cache.get(("0123456789abcdef", "Okay-ish ride")) is None \
+    and analysis_cache.get((live, "Fine ride"))["lexicon_version"] == lexicons.current.version
+print(f"  {PASS if ok else FAIL}  Restore keeps entries for digest {live} only")
+results.append(ok)
+
+
+# ─── Test 5: Driver cache skips the read; stale cache falls back safely ────
+drivers = DriverService()
+drivers.repo = MagicMock()
+drivers.repo.update_driver.return_value = [{"driver_id": "drv_c"}]
+drivers.cache.put("drv_c", (3.0, 4))
+fast = drivers.update_driver_score("drv_c", new_score=1.0)
+read_skipped = not drivers.repo.get_driver.called
+
+# Another worker wrote in between: conditional update matches nothing
+drivers.repo.update_driver.side_effect = [[], [{"driver_id": "drv_c"}]]
+drivers.repo.get_driver.return_value = {"score": 2.0, "total_count": 9}
+recovered = drivers.update_driver_score("drv_c", new_score=1.0)
+
+drivers.repo.update_driver.side_effect = [[], []]    # cached write, then re-read write
+try:
+    drivers.update_driver_score("drv_c", new_score=1.0)
+    raced = False
+except StaleDriverState:
+    raced = True
+
+ok = read_skipped and abs(fast - (ALPHA * 1.0 + (1 - ALPHA) * 3.0)) < 1e-9 \
+    and abs(recovered - (ALPHA * 1.0 + (1 - ALPHA) * 2.0)) < 1e-9 and raced
+print(f"  {PASS if ok else FAIL}  Cached → no read ({fast:.2f}); stale → re-read ({recovered:.2f}); lost race → retry")
+results.append(ok)
+
+
+# ─── Test 6: /ready flips once warm-up is done ─────────────────────────────
+header("READY: readiness after warm-up")
+
+main.ready.clear()
+with TestClient(main.app) as client:
+    deadline = time.time() + 10
+    status = client.get("/ready").status_code
+    while status != 200 and time.time() < deadline:
+        time.sleep(0.05)
+        status = client.get("/ready").status_code
+    health = client.get("/health").status_code
+ok = status == 200 and health == 200
+print(f"  {PASS if ok else FAIL}  /ready → {status}, /health → {health}\n")
+results.append(ok)
+
+
+passed = sum(results)
+print("=" * 60)
+print(f"Results: {passed}/{len(results)} passed")
+print("=" * 60)